@@ -0,0 +1,154 @@
+"""Response compression CPU time versus bytes benchmark.
+
+Compresses typical scaffold payloads (list pages of different sizes,
+error envelopes) with every registered codec and level and reports
+compressed size, CPU time per body and the cost of a cached body
+(`CompressedBodies` hit) for comparison.
+
+Usage:
+    python benchmarks/compression.py
+    python benchmarks/compression.py --levels 1,6,9 --pages 20,100,1000
+    python benchmarks/compression.py --json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from pydantic import Field  # noqa: E402
+
+from fastapi_scaffold.compression import (  # noqa: E402
+    CompressedBodies,
+    get_codec,
+)
+from fastapi_scaffold.http_responses import (  # noqa: E402
+    Response404,
+    Response503,
+)
+from fastapi_scaffold.pagination import PaginationParams  # noqa: E402
+from fastapi_scaffold.responses import ListResponse, Schema  # noqa: E402
+
+
+SEED = 42
+
+
+class User(Schema):
+    id: int
+    name: str
+    email: str
+    age: int = Field(..., ge=0)
+    bio: str
+
+
+def payloads(pages: list[int]) -> dict[str, bytes]:
+    """Returns serialized response bodies by name."""
+    rnd = random.Random(SEED)
+    words = ["alpha", "beta", "gamma", "delta", "omega", "sigma", "kappa"]
+    bodies = {}
+    for per_page in pages:
+        users = [
+            User(
+                id=i,
+                name=f"User {i}",
+                email=f"user{i}@example.com",
+                age=rnd.randint(1, 99),
+                bio=" ".join(rnd.choices(words, k=12)),
+            )
+            for i in range(per_page)
+        ]
+        response = ListResponse[User].from_list(
+            users, per_page * 50, PaginationParams(1, per_page), None
+        )
+        bodies[f"list_{per_page}"] = response.model_dump_json().encode()
+    bodies["error_404"] = Response404().model_dump_json().encode()
+    bodies["error_503"] = Response503().model_dump_json().encode()
+    return bodies
+
+
+def cpu_time(func, repeat: int) -> float:
+    """Returns CPU seconds per call."""
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - start) / repeat
+
+
+def run(args: argparse.Namespace) -> list[dict]:
+    rows = []
+    # All registered codecs.
+    encodings = CompressedBodies().encodings
+    for name, body in payloads(args.pages).items():
+        # Enough repeats for ~1 MiB of input per measurement.
+        repeat = max(args.repeat, 2 ** 20 // len(body))
+        for encoding in encodings:
+            compress = get_codec(encoding)
+            for level in args.levels:
+                compressed = compress(body, level)
+                seconds = cpu_time(lambda: compress(body, level), repeat)
+
+                bodies = CompressedBodies(
+                    encodings=[encoding], level=level, min_size=0
+                )
+                # The second compression caches the body.
+                bodies.compress(body, encoding)
+                bodies.compress(body, encoding)
+                cached = cpu_time(
+                    lambda: bodies.compress(body, encoding), repeat
+                )
+                rows.append({
+                    "payload": name,
+                    "encoding": encoding,
+                    "level": level,
+                    "bytes": len(body),
+                    "compressed_bytes": len(compressed),
+                    "ratio": len(compressed) / len(body),
+                    "cpu_us": seconds * 1e6,
+                    "cached_us": cached * 1e6,
+                    "mb_per_s": len(body) / seconds / 2 ** 20
+                    if seconds else 0.0,
+                })
+    return rows
+
+
+def print_rows(rows: list[dict]) -> None:
+    print(f"{'payload':<12}{'codec':<9}{'level':>6}{'bytes':>10}"
+          f"{'compressed':>12}{'ratio':>8}{'cpu us':>10}{'cached us':>11}"
+          f"{'MiB/s':>9}")
+    for row in rows:
+        print(
+            f"{row['payload']:<12}{row['encoding']:<9}{row['level']:>6}"
+            f"{row['bytes']:>10}{row['compressed_bytes']:>12}"
+            f"{row['ratio']:>8.3f}{row['cpu_us']:>10.1f}"
+            f"{row['cached_us']:>11.2f}{row['mb_per_s']:>9.1f}"
+        )
+
+
+def parse_ints(value: str) -> list[int]:
+    return [int(part) for part in value.split(",")]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=parse_ints, default=[1, 6, 9],
+                        help="compression levels, comma separated")
+    parser.add_argument("--pages", type=parse_ints, default=[20, 100, 1000],
+                        help="list page sizes, comma separated")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="minimum compressions per measurement")
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    rows = run(args)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_rows(rows)
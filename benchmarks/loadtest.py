@@ -0,0 +1,452 @@
+"""End-to-end load test for a scaffold-based application.
+
+Boots an application similar to `src/example.py` backed by a seeded
+SQLite database (aiosqlite) and drives a mix of list, detail,
+validation error and internal error requests through the whole stack:
+routing, pagination and sorting queries, response models and the
+exception handlers.
+
+Requires `httpx` and `aiosqlite` (and `uvicorn` for the socket mode)
+in addition to the library dependencies.
+
+Usage:
+    # In-process (ASGI transport), 50 concurrent clients for 10 seconds
+    python benchmarks/loadtest.py --concurrency 50 --duration 10
+
+    # Local socket with 2 uvicorn workers at fixed 500 RPS
+    python benchmarks/loadtest.py --mode socket --workers 2 --rps 500
+
+    # Custom traffic mix (weights)
+    python benchmarks/loadtest.py --mix list=6,detail=3,validation=1,error=0
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import httpx  # noqa: E402
+import sqlalchemy as sa  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from pydantic import Field  # noqa: E402
+from sqlalchemy.ext.asyncio import (  # noqa: E402
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column  # noqa: E402
+
+from fastapi_scaffold import FastAPIScaffold  # noqa: E402
+from fastapi_scaffold.exc import ResourceNotFound  # noqa: E402
+from fastapi_scaffold.http_responses import responses_for_codes  # noqa: E402
+from fastapi_scaffold.pagination import (  # noqa: E402
+    PaginationParamsQuery,
+    paginate,
+)
+from fastapi_scaffold.responses import (  # noqa: E402
+    DataResponse,
+    ListResponse,
+    Schema,
+)
+from fastapi_scaffold.sorting import (  # noqa: E402
+    SortParams,
+    get_sort_params,
+    sort,
+)
+
+
+DATABASE_ENV = "LOADTEST_DATABASE"
+SEED = 42
+
+
+# Application
+
+class Base(DeclarativeBase):
+    pass
+
+
+class UserModel(Base):
+    __tablename__ = "users"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str]
+    age: Mapped[int]
+
+
+class User(Schema):
+    id: int
+    name: str
+    age: int = Field(..., ge=0)
+
+
+async def seed(engine, rows: int) -> None:
+    """Creates the schema and fills it with deterministic rows."""
+    rnd = random.Random(SEED)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            sa.insert(UserModel),
+            [
+                {"id": i, "name": f"User {i}", "age": rnd.randint(1, 99)}
+                for i in range(1, rows + 1)
+            ],
+        )
+
+
+def create_app() -> FastAPI:
+    """Application factory (also used by uvicorn in the socket mode)."""
+    database = os.environ[DATABASE_ENV]
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database}")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        yield
+        await engine.dispose()
+
+    app = FastAPI(lifespan=lifespan)
+    FastAPIScaffold(app)
+
+    async def get_session() -> AsyncIterator[AsyncSession]:
+        async with session_factory() as session:
+            yield session
+
+    @app.get(
+        "/users",
+        response_model=ListResponse[User],
+        responses=responses_for_codes(400, 500),
+    )
+    async def get_users(
+        pagination: PaginationParamsQuery,
+        sorting: SortParams = Depends(get_sort_params("name", "age")),
+        session: AsyncSession = Depends(get_session),
+    ):
+        stmt = sort(sa.select(UserModel), sorting=sorting, model=UserModel)
+        users, total = await paginate(session, stmt, pagination=pagination)
+        return ListResponse[User].from_list(
+            [User.model_validate(u) for u in users],
+            total,
+            pagination,
+            None,
+        )
+
+    @app.get(
+        "/users/{user_id}",
+        response_model=DataResponse.single_by_key("user", User),
+    )
+    async def get_user(
+        user_id: int, session: AsyncSession = Depends(get_session)
+    ):
+        user = await session.get(UserModel, user_id)
+        if user is None:
+            raise ResourceNotFound(f"User {user_id} isn't found")
+        return DataResponse(data={"user": User.model_validate(user)})
+
+    @app.get("/errors/internal")
+    async def get_internal_error():
+        raise RuntimeError("Load test error")
+
+    return app
+
+
+# Traffic
+
+@dataclass
+class Result:
+    kind: str
+    status: int
+    latency: float
+
+
+@dataclass
+class Report:
+    results: list[Result] = field(default_factory=list)
+    rss: list[tuple[float, int]] = field(default_factory=list)
+    failures: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+
+
+def request_factory(
+        rows: int, rnd: random.Random
+) -> dict[str, Callable[[], str]]:
+    """Returns URL generators by traffic kind."""
+    pages = max(rows // 20, 1)
+    return {
+        "list": lambda: (
+            f"/users?page={rnd.randint(1, pages)}&per_page=20"
+            f"&sort_by={rnd.choice(['name', 'age'])}"
+            f"&sort_order={rnd.choice(['asc', 'desc'])}"
+        ),
+        "detail": lambda: f"/users/{rnd.randint(1, rows + rows // 10)}",
+        "validation": lambda: "/users?page=0&per_page=-1",
+        "error": lambda: "/errors/internal",
+    }
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+async def fire(
+        client: httpx.AsyncClient, kind: str, url: str, report: Report
+) -> None:
+    start = time.perf_counter()
+    try:
+        response = await client.get(url)
+    except httpx.HTTPError:
+        report.failures += 1
+        return
+    report.results.append(
+        Result(kind, int(response.status_code), time.perf_counter() - start)
+    )
+
+
+async def run_load(
+        client: httpx.AsyncClient,
+        args: argparse.Namespace,
+        report: Report,
+) -> None:
+    rnd = random.Random(SEED)
+    urls = request_factory(args.rows, rnd)
+    mix = parse_mix(args.mix)
+    kinds = [k for k in mix if mix[k] > 0]
+    weights = [mix[k] for k in kinds]
+
+    def next_request() -> tuple[str, str]:
+        kind = rnd.choices(kinds, weights)[0]
+        return kind, urls[kind]()
+
+    deadline = time.perf_counter() + args.duration
+    if args.rps:
+        # Open loop: requests are sent on schedule regardless of latency.
+        interval = 1 / args.rps
+        tasks = set()
+        next_at = time.perf_counter()
+        while next_at < deadline:
+            kind, url = next_request()
+            task = asyncio.create_task(fire(client, kind, url, report))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        await asyncio.gather(*tasks)
+    else:
+        # Closed loop: every client sends a new request after a response.
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                kind, url = next_request()
+                await fire(client, kind, url, report)
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+def rss_bytes(pids: list[int]) -> int:
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for pid in pids:
+        with contextlib.suppress(OSError):
+            total += int(Path(f"/proc/{pid}/statm").read_text().split()[1])
+    return total * page_size
+
+
+def child_pids(pid: int) -> list[int]:
+    pids = [pid]
+    with contextlib.suppress(OSError):
+        for task in Path(f"/proc/{pid}/task").iterdir():
+            children = (task / "children").read_text().split()
+            for child in children:
+                pids.extend(child_pids(int(child)))
+    return pids
+
+
+async def sample_rss(
+        report: Report, pids: Callable[[], list[int]], interval: float
+) -> None:
+    while True:
+        if Path("/proc").exists():
+            rss = rss_bytes(pids())
+        else:
+            # Peak RSS only, in KiB on Linux and bytes on macOS.
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report.rss.append((time.perf_counter() - report.started, rss))
+        await asyncio.sleep(interval)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            with contextlib.suppress(httpx.HTTPError):
+                await client.get(f"{url}/openapi.json")
+                return
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"Server at {url} didn't start")
+
+
+async def main(args: argparse.Namespace) -> Report:
+    os.environ.setdefault(
+        DATABASE_ENV, str(Path(tempfile.mkdtemp()) / "loadtest.db")
+    )
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{os.environ[DATABASE_ENV]}"
+    )
+    await seed(engine, args.rows)
+    await engine.dispose()
+
+    report = Report()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    server = None
+    if args.mode == "socket":
+        port = free_port()
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn",
+                "--factory", "loadtest:create_app",
+                "--app-dir", str(Path(__file__).parent),
+                "--port", str(port),
+                "--workers", str(args.workers),
+                "--log-level", "critical",
+                "--no-access-log",
+            ],
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        await wait_for_server(base_url)
+        client = httpx.AsyncClient(base_url=base_url, limits=limits)
+        pids = lambda: child_pids(server.pid)  # noqa: E731
+    else:
+        app = create_app()
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(
+            transport=transport, base_url="http://loadtest", limits=limits
+        )
+        pids = lambda: [os.getpid()]  # noqa: E731
+
+    try:
+        async with client:
+            # Warm up caches (OpenAPI, SQLAlchemy compiled statements).
+            for _ in range(20):
+                await client.get("/users")
+            report.started = time.perf_counter()
+            sampler = asyncio.create_task(
+                sample_rss(report, pids, args.rss_interval)
+            )
+            await run_load(client, args, report)
+            report.finished = time.perf_counter()
+            sampler.cancel()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return report
+
+
+# Report
+
+def percentile(values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[rank]
+
+
+def summarize(report: Report) -> dict:
+    elapsed = report.finished - report.started
+    groups: dict[str, list[Result]] = {"all": report.results}
+    for result in report.results:
+        groups.setdefault(result.kind, []).append(result)
+
+    summary: dict = {"elapsed": elapsed, "failures": report.failures}
+    for kind, results in groups.items():
+        latencies = sorted(r.latency for r in results)
+        statuses: dict[int, int] = {}
+        for r in results:
+            statuses[r.status] = statuses.get(r.status, 0) + 1
+        summary[kind] = {
+            "requests": len(results),
+            "throughput": len(results) / elapsed if elapsed else 0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "statuses": statuses,
+        }
+    summary["rss_mb"] = [
+        [round(t, 2), round(rss / 2 ** 20, 1)] for t, rss in report.rss
+    ]
+    return summary
+
+
+def print_summary(summary: dict) -> None:
+    print(f"Elapsed: {summary['elapsed']:.2f}s, "
+          f"transport failures: {summary['failures']}")
+    print(f"{'kind':<12}{'requests':>10}{'rps':>10}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    for kind, data in summary.items():
+        if not isinstance(data, dict):
+            continue
+        print(
+            f"{kind:<12}{data['requests']:>10}{data['throughput']:>10.1f}"
+            f"{data['p50_ms']:>10.2f}{data['p95_ms']:>10.2f}"
+            f"{data['p99_ms']:>10.2f}  {data['statuses']}"
+        )
+    print("RSS over time (s, MiB):")
+    for t, rss in summary["rss_mb"]:
+        print(f"  {t:>8.2f} {rss:>10.1f}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--mode", choices=["inprocess", "socket"], default="inprocess"
+    )
+    parser.add_argument("--workers", type=int, default=1,
+                        help="uvicorn workers in the socket mode")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=20,
+                      help="closed loop: number of concurrent clients")
+    load.add_argument("--rps", type=float, default=None,
+                      help="open loop: fixed requests per second")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="load duration in seconds")
+    parser.add_argument("--mix", default="list=6,detail=3,validation=1,"
+                        "error=1", help="traffic kinds weights")
+    parser.add_argument("--rows", type=int, default=10_000,
+                        help="number of seeded users")
+    parser.add_argument("--rss-interval", type=float, default=1.0)
+    parser.add_argument("--json", action="store_true",
+                        help="print the report as JSON")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    summary = summarize(asyncio.run(main(args)))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
@@ -1,5 +1,10 @@
-from fastapi import FastAPI
+import os
+from collections.abc import Sequence
 
+from fastapi import FastAPI, params
+
+from fastapi_scaffold.compression import CompressedBodies, init_compression
+from fastapi_scaffold.deadlines import Deadlines, init_deadlines
 from fastapi_scaffold.exception_handlers import (
     init_exc_handlers,
     init_responses,
@@ -8,10 +13,16 @@ from fastapi_scaffold.http_responses import (  # noqa: F401
     Response200,
     Response201,
 )
+from fastapi_scaffold.limiting import LoadShedder, init_load_shedding
+from fastapi_scaffold.metrics import Metrics, init_metrics
+from fastapi_scaffold.openapi import init_openapi_cache
 from fastapi_scaffold.pagination import (  # noqa: F401
     PaginationParamsQuery,
     paginate,
+    paginate_aiter,
+    paginate_sequence,
 )
+from fastapi_scaffold.profiling import AllocationProfiler, init_profiling
 from fastapi_scaffold.responses import (  # noqa: F401
     BaseResponse,
     DataResponse,
@@ -29,8 +40,106 @@ class FastAPIScaffold:
         - Schemas
         - Error handlers
         - Query helpers
+        - Request deadlines (optional)
+        - Load shedding (optional)
+        - Response compression (optional)
+        - Metrics (optional)
+        - OpenAPI schema cache (optional)
+        - Allocation profiling (optional)
+
+    Args:
+        app: The FastAPI application instance.
+        debug: Adds debug info to 500 responses.
+        deadlines: Sets request deadlines from the timeout header, `True`
+            uses default settings.
+        load_shedding: Rejects requests over adaptive concurrency limits
+            with 503, `True` creates a shedder with default settings.
+        compression: Compresses JSON responses negotiated by
+            `Accept-Encoding` with cached bodies, `True` creates a cache
+            with default settings.
+        metrics: Collects request metrics, `True` creates a new storage.
+        metrics_path: Prometheus metrics endpoint path.
+        openapi_cache: Builds OpenAPI schema on startup, `True` keeps it
+            in memory, a path also stores it to a file shared by workers.
+        profiling: Profiles allocations of sampled requests with
+            tracemalloc, `True` creates a profiler with default settings.
+        profiling_path: Allocation profiles debug endpoint path.
+        profiling_dependencies: Debug endpoint dependencies checking
+            access. The endpoint isn't mounted without them.
     """
 
-    def __init__(self, app: FastAPI, debug: bool = False):
+    def __init__(
+            self,
+            app: FastAPI,
+            debug: bool = False,
+            deadlines: Deadlines | bool = False,
+            load_shedding: LoadShedder | bool = False,
+            compression: CompressedBodies | bool = False,
+            metrics: Metrics | bool = False,
+            metrics_path: str | None = "/metrics",
+            openapi_cache: str | os.PathLike | bool = False,
+            profiling: AllocationProfiler | bool = False,
+            profiling_path: str | None = "/debug/allocations",
+            profiling_dependencies: Sequence[params.Depends] | None = None,
+    ):
         init_responses(app)
         init_exc_handlers(app, debug=debug)
+
+        # Added first to be the inner one and profile only the request
+        # handling.
+        self.profiler = None
+        if profiling:
+            self.profiler = init_profiling(
+                app,
+                profiler=(
+                    profiling
+                    if isinstance(profiling, AllocationProfiler) else None
+                ),
+                path=profiling_path,
+                dependencies=profiling_dependencies,
+            )
+
+        self.deadlines = None
+        if deadlines:
+            self.deadlines = init_deadlines(
+                app,
+                deadlines=(
+                    deadlines if isinstance(deadlines, Deadlines) else None
+                ),
+            )
+
+        self.load_shedder = None
+        if load_shedding:
+            self.load_shedder = init_load_shedding(
+                app,
+                shedder=(
+                    load_shedding
+                    if isinstance(load_shedding, LoadShedder) else None
+                ),
+            )
+
+        self.compression = None
+        if compression:
+            self.compression = init_compression(
+                app,
+                bodies=(
+                    compression
+                    if isinstance(compression, CompressedBodies) else None
+                ),
+            )
+
+        # Added after load shedding to be the outer one and count
+        # rejected requests.
+        self.metrics = None
+        if metrics:
+            self.metrics = init_metrics(
+                app,
+                metrics=metrics if isinstance(metrics, Metrics) else None,
+                path=metrics_path,
+            )
+
+        if openapi_cache:
+            init_openapi_cache(
+                app,
+                path=None if openapi_cache is True else openapi_cache,
+            )
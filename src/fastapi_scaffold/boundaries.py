@@ -0,0 +1,279 @@
+import bisect
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Sequence
+from typing import Any, NamedTuple
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import ColumnElement, UnaryExpression
+from sqlalchemy.sql.util import find_tables
+
+from fastapi_scaffold.coalescing import statement_key
+from fastapi_scaffold.sorting import Model
+
+
+class Seek(NamedTuple):
+    """Statement rewritten to start from the nearest page boundary."""
+    key: Hashable
+    statement: sa.Select[Any]
+    columns: Sequence[ColumnElement[Any]]
+    position: int
+
+
+class _Entry:
+    def __init__(self, tables: frozenset[str]) -> None:
+        self.tables = tables
+        self.positions: list[int] = []
+        self.values: dict[int, tuple[Any, ...]] = {}
+        self.created_at = time.monotonic()
+
+
+def _order_columns(
+        statement: sa.Select[Any],
+) -> list[tuple[ColumnElement[Any], bool]] | None:
+    """Returns `ORDER BY` columns with descending flags.
+
+    Returns `None` if the ordering can't be used for seeking (textual
+    clauses, `NULLS FIRST/LAST`, expressions other than table columns or
+    nullable columns: `NULL` values don't compare in the seek condition).
+    """
+    columns = []
+    for clause in statement._order_by_clauses:
+        descending = False
+        if isinstance(clause, UnaryExpression):
+            if clause.modifier is operators.desc_op:
+                descending = True
+            elif clause.modifier is not operators.asc_op:
+                return None
+            clause = clause.element
+        if not isinstance(clause, sa.Column) or clause.nullable:
+            return None
+        columns.append((clause, descending))
+
+    # Seeking requires unique ordering: add the primary key as a
+    # tie-breaker for rows with equal sort values.
+    froms = statement.get_final_froms()
+    if len(froms) != 1 or not isinstance(froms[0], sa.Table):
+        return None
+    ordered = {
+        (getattr(c, "table", None), getattr(c, "name", None))
+        for c, _ in columns
+    }
+    for pk in froms[0].primary_key.columns:
+        if (pk.table, pk.name) not in ordered:
+            columns.append((pk, False))
+    return columns
+
+
+def _seek_condition(
+        columns: Sequence[tuple[ColumnElement[Any], bool]],
+        values: Sequence[Any],
+) -> ColumnElement[bool]:
+    """Returns condition for rows at or after the boundary row."""
+    directions = {descending for _, descending in columns}
+    if len(directions) == 1:
+        left = sa.tuple_(*(column for column, _ in columns))
+        right = sa.tuple_(*values)
+        return left <= right if directions.pop() else left >= right
+
+    conditions = []
+    equal: list[ColumnElement[bool]] = []
+    for (column, descending), value in zip(columns, values):
+        after = column < value if descending else column > value
+        conditions.append(sa.and_(*equal, after))
+        equal.append(column == value)
+    conditions.append(sa.and_(*equal))
+    return sa.or_(*conditions)
+
+
+class BoundaryIndex:
+    """Sort key index of every `stride`-th row to seek deep pages.
+
+    Pages visited with `paginate` record sort keys of rows at positions
+    multiple of `stride` (or `build` records all of them). A request
+    for a deep page then seeks from the nearest recorded boundary with
+    a `WHERE` condition and a small `OFFSET` instead of skipping all
+    previous rows.
+
+    The statement must be ordered by non-null columns of the selected
+    table, other statements are paginated with `OFFSET` as usual. The
+    table primary key is appended to the ordering to make it unique.
+
+    Boundaries are kept in the process memory and `watch` sees ORM
+    changes of this process only. Rows inserted or deleted before a
+    boundary by other workers or by Core and bulk statements shift seek
+    pages and page totals until the boundaries expire by `ttl`, so keep
+    it short for tables changed by several workers.
+
+    Args:
+        stride: Distance between recorded boundaries in rows.
+        max_statements: Number of indexed statements (LRU).
+        max_boundaries: Number of boundaries per statement.
+        ttl: Seconds to keep statement boundaries, forever if `None`.
+    """
+
+    def __init__(
+            self,
+            stride: int = 1000,
+            max_statements: int = 128,
+            max_boundaries: int = 10_000,
+            ttl: float | None = 60,
+    ) -> None:
+        self.stride = stride
+        self.max_statements = max_statements
+        self.max_boundaries = max_boundaries
+        self.ttl = ttl
+        self.seeks = 0
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._watched: set[type] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry(self, key: Hashable) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl is not None:
+            if time.monotonic() - entry.created_at > self.ttl:
+                del self._entries[key]
+                return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def seek(
+            self,
+            session: AsyncSession,
+            statement: sa.Select[Any],
+            offset: int,
+    ) -> Seek | None:
+        """Rewrites statement to start from the nearest boundary.
+
+        Args:
+            session: The SQLAlchemy session.
+            statement: The ordered statement without offset and limit.
+            offset: Offset of the requested page.
+
+        Returns:
+            Seek statement with the boundary position (0 if no boundary
+            is recorded) or `None` if the ordering can't be indexed.
+        """
+        columns = _order_columns(statement)
+        if columns is None:
+            return None
+        statement = statement.order_by(None).order_by(*(
+            column.desc() if descending else column.asc()
+            for column, descending in columns
+        ))
+        key = statement_key(session, statement)
+        key_columns = [column for column, _ in columns]
+
+        position = 0
+        entry = self._entry(key)
+        if entry is not None:
+            i = bisect.bisect_right(entry.positions, offset) - 1
+            if i >= 0:
+                position = entry.positions[i]
+                statement = statement.where(
+                    _seek_condition(columns, entry.values[position])
+                )
+                self.seeks += 1
+        return Seek(key, statement, key_columns, position)
+
+    def record(
+            self,
+            seek: Seek,
+            offset: int,
+            keys: Sequence[tuple[Any, ...]],
+    ) -> None:
+        """Records boundaries of the fetched page.
+
+        Args:
+            seek: The page seek.
+            offset: Position of the first row of the page.
+            keys: Sort key values of the page rows.
+        """
+        # The first row needs no boundary: it's where seeking starts.
+        first = max(-(-offset // self.stride), 1) * self.stride
+        if first >= offset + len(keys):
+            return
+
+        entry = self._entry(seek.key)
+        if entry is None:
+            tables = frozenset(
+                table.name for table in find_tables(seek.statement)
+            )
+            entry = self._entries[seek.key] = _Entry(tables)
+            if len(self._entries) > self.max_statements:
+                self._entries.popitem(last=False)
+
+        for position in range(first, offset + len(keys), self.stride):
+            if len(entry.positions) >= self.max_boundaries:
+                break
+            if position not in entry.values:
+                bisect.insort(entry.positions, position)
+                entry.values[position] = tuple(keys[position - offset])
+
+    async def build(
+            self,
+            session: AsyncSession,
+            statement: sa.Select[Any],
+            chunk_size: int = 10_000,
+    ) -> None:
+        """Records all boundaries of the statement in one pass.
+
+        Only sort key columns are fetched.
+
+        Args:
+            session: The SQLAlchemy session.
+            statement: The ordered statement without offset and limit.
+            chunk_size: Number of rows fetched at once.
+        """
+        seek = self.seek(session, statement, 0)
+        if seek is None:
+            raise ValueError(f"Invalid statement ordering: {statement}")
+        keys_statement = seek.statement.with_only_columns(*seek.columns)
+        result = await session.stream(
+            keys_statement.execution_options(yield_per=chunk_size)
+        )
+        position = 0
+        async for rows in result.partitions(chunk_size):
+            self.record(seek, position, [row._tuple() for row in rows])
+            position += len(rows)
+
+    def invalidate(self, table: str | None = None) -> None:
+        """Drops boundaries of statements selecting from the table.
+
+        Args:
+            table: The table name, drops all boundaries if not provided.
+        """
+        if table is None:
+            self._entries.clear()
+            return
+        for key, entry in list(self._entries.items()):
+            if table in entry.tables:
+                del self._entries[key]
+
+    def watch(self, *models: Model) -> None:
+        """Invalidates boundaries on ORM inserts, updates and deletes.
+
+        Bulk and Core statements don't emit ORM events, call
+        `invalidate` after them.
+
+        Args:
+            *models: ORM models to watch.
+        """
+        for model in models:
+            if model in self._watched:
+                continue
+            self._watched.add(model)
+            table = model.__table__.name
+
+            def invalidate(mapper: Any, connection: Any, target: Any,
+                           table: str = table) -> None:
+                self.invalidate(table)
+
+            for event in ("after_insert", "after_update", "after_delete"):
+                sa.event.listen(model, event, invalidate, propagate=True)
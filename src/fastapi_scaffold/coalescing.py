@@ -0,0 +1,168 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Executable
+
+from fastapi_scaffold.deadlines import remaining
+from fastapi_scaffold.exc import DeadlineExceeded, GatewayTimeout
+
+
+class _Abandoned(Exception):
+    """The leader call was cancelled or its deadline expired, a waiting
+    call must run by itself.
+    """
+
+
+class SingleFlightStats:
+    """Single-flight counters.
+
+    Attributes:
+        leaders: Calls that ran the function.
+        coalesced: Calls that waited for a result of another call.
+        abandoned: Cancelled leader calls.
+        timeouts: Calls that timed out.
+    """
+
+    def __init__(self) -> None:
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+        self.timeouts = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(vars(self))
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls into one.
+
+    The first call with a key (the leader) runs the function, calls
+    with the same key made before it finishes wait for the leader and
+    get the same result or exception. Results are shared, so treat
+    them as read-only. ORM instances in results belong to the leader
+    session: waiting calls must not lazy load their relationships or
+    use them after the leader session is closed.
+
+    If the leader is cancelled or its request deadline expires (see
+    `deadlines`), waiting calls aren't affected: one of them runs the
+    function again. A cancelled waiting call doesn't affect others.
+    A waiting call is bounded by its own request deadline too.
+
+    Args:
+        timeout: Default timeout in seconds for both leader and waiting
+            calls, `GatewayTimeout` is raised when it expires.
+    """
+
+    def __init__(self, timeout: float | None = None) -> None:
+        self.timeout = timeout
+        self.stats = SingleFlightStats()
+        self._flights: dict[Hashable, asyncio.Future[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do[T](
+            self,
+            key: Hashable,
+            func: Callable[[], Awaitable[T]],
+            *,
+            timeout: float | None = None,
+    ) -> T:
+        """Runs `func` or waits for a running call with the same key.
+
+        Args:
+            key: The call key.
+            func: Async callable to run.
+            timeout: The call timeout, `SingleFlight.timeout` if not
+                provided.
+
+        Returns:
+            The `func` result.
+
+        Raises:
+            GatewayTimeout: The call timed out.
+            DeadlineExceeded: The request deadline expired while waiting
+                for the leader.
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        coalesced = False
+        while (flight := self._flights.get(key)) is not None:
+            if not coalesced:
+                coalesced = True
+                self.stats.coalesced += 1
+            budget = remaining()
+            wait = _min_timeout(timeout, budget)
+            try:
+                async with asyncio.timeout(wait) as waiting:
+                    return await asyncio.shield(flight)
+            except _Abandoned:
+                continue
+            except TimeoutError:
+                if not waiting.expired():
+                    raise
+                if budget is not None and wait == budget:
+                    # The waiting call request deadline expired.
+                    raise DeadlineExceeded()
+                self.stats.timeouts += 1
+                raise GatewayTimeout() from None
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        self.stats.leaders += 1
+        try:
+            async with asyncio.timeout(timeout) as running:
+                result = await func()
+        except (asyncio.CancelledError, DeadlineExceeded):
+            # The leader request deadline isn't the deadline of waiting
+            # requests, they run the function by themselves.
+            self.stats.abandoned += 1
+            self._finish(flight, _Abandoned())
+            raise
+        except TimeoutError as exc:
+            if not running.expired():
+                self._finish(flight, exc)
+                raise
+            self.stats.timeouts += 1
+            error = GatewayTimeout()
+            self._finish(flight, error)
+            raise error from None
+        except BaseException as exc:
+            self._finish(flight, exc)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    @staticmethod
+    def _finish(flight: asyncio.Future[Any], exc: BaseException) -> None:
+        flight.set_exception(exc)
+        # Nobody may wait for the flight, mark the exception as retrieved.
+        flight.exception()
+
+
+def _min_timeout(*timeouts: float | None) -> float | None:
+    """Returns the shortest timeout, `None` if there are no timeouts."""
+    return min((t for t in timeouts if t is not None), default=None)
+
+
+def statement_key(session: AsyncSession, statement: Executable) -> Hashable:
+    """Returns a key of the compiled statement and its parameters.
+
+    Args:
+        session: The SQLAlchemy session the statement runs on.
+        statement: The SQLAlchemy statement.
+
+    Returns:
+        Hashable key equal for identical statements.
+    """
+    bind = session.get_bind()
+    compiled = statement.compile(dialect=bind.dialect)
+    params = repr(sorted(compiled.params.items()))
+    return (str(bind.engine.url), str(compiled), params)
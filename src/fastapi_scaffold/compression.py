@@ -0,0 +1,330 @@
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Sequence
+
+from fastapi import FastAPI
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+type Compressor = Callable[[bytes, int], bytes]
+"""Compresses data with the compression level."""
+
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "text/")
+
+_codecs: dict[str, Compressor] = {}
+
+
+def register_codec(encoding: str, compress: Compressor) -> None:
+    """Registers a content coding for compression negotiation.
+
+    Example:
+        >>> import brotli
+        >>> register_codec(
+        ...     "br", lambda data, level: brotli.compress(data, quality=level)
+        ... )
+
+    Args:
+        encoding: `Content-Encoding` token, e.g. `br`.
+        compress: Compressor taking data and compression level.
+    """
+    _codecs[encoding.lower()] = compress
+
+
+def get_codec(encoding: str) -> Compressor:
+    """Returns registered compressor of the content coding.
+
+    Raises:
+        KeyError: The coding isn't registered.
+    """
+    return _codecs[encoding]
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _deflate(data: bytes, level: int) -> bytes:
+    # HTTP `deflate` is the zlib format, not raw deflate.
+    return zlib.compress(data, level)
+
+
+register_codec("gzip", _gzip)
+register_codec("deflate", _deflate)
+
+
+def negotiate(
+        accept_encoding: str | None, encodings: Sequence[str]
+) -> str | None:
+    """Selects content coding by `Accept-Encoding` header.
+
+    Args:
+        accept_encoding: The header value.
+        encodings: Available codings in preference order.
+
+    Returns:
+        Coding with the highest quality value (the first available one
+        on a tie) or `None` for the identity.
+    """
+    if not accept_encoding:
+        return None
+
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding] = quality
+
+    default = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, default)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionStats:
+    """Compression counters.
+
+    Attributes:
+        hits: Bodies taken from the cache.
+        misses: Bodies compressed.
+        skipped: Bodies sent uncompressed (small, not accepted by the
+            client or not shrinking).
+        bytes_in: Uncompressed size of compressed bodies.
+        bytes_out: Size of compressed bodies.
+        compress_seconds: Time spent compressing.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compress_seconds = 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return dict(vars(self))
+
+
+class CompressedBodies:
+    """LRU cache of compressed response bodies by content coding.
+
+    Bodies are cached by their content, so repeated bodies (hot list
+    pages, error envelopes) are compressed once for every coding, and
+    a changed body never gets a stale compressed one.
+
+    A body is cached only when it's seen the second time: one-off
+    bodies (cold pages, personal data) are compressed without caching
+    and don't evict hot ones. Bodies seen once are remembered by their
+    hashes only.
+
+    Args:
+        encodings: Codings in preference order, all registered ones
+            if not provided.
+        level: Compression level.
+        min_size: Bodies smaller than this number of bytes aren't
+            compressed.
+        max_bytes: Size limit of cached bodies, both uncompressed keys
+            and compressed values.
+        max_candidates: Number of remembered hashes of bodies seen once.
+    """
+
+    def __init__(
+            self,
+            encodings: Iterable[str] | None = None,
+            level: int = 6,
+            min_size: int = 1024,
+            max_bytes: int = 16 * 1024 * 1024,
+            max_candidates: int = 4096,
+    ) -> None:
+        self.encodings = (
+            list(encodings) if encodings is not None else list(_codecs)
+        )
+        self.level = level
+        self.min_size = min_size
+        self.max_bytes = max_bytes
+        self.max_candidates = max_candidates
+        self.size = 0
+        self.stats = CompressionStats()
+        self._bodies: OrderedDict[bytes, dict[str, bytes]] = OrderedDict()
+        self._candidates: OrderedDict[int, None] = OrderedDict()
+
+    def select(self, accept_encoding: str | None, size: int) -> str | None:
+        """Returns content coding for a body or `None` for the identity."""
+        if size < self.min_size:
+            return None
+        return negotiate(accept_encoding, self.encodings)
+
+    def compress(self, body: bytes, encoding: str) -> bytes | None:
+        """Returns cached or new compressed body.
+
+        Args:
+            body: Uncompressed body.
+            encoding: Content coding.
+
+        Returns:
+            Compressed body or `None` if compression doesn't shrink it.
+        """
+        encoded = self._bodies.get(body)
+        if encoded is not None:
+            self._bodies.move_to_end(body)
+            if encoding in encoded:
+                self.stats.hits += 1
+                return encoded[encoding] or None
+        elif self._admit(body):
+            encoded = self._bodies[body] = {}
+            self.size += len(body)
+
+        start = time.perf_counter()
+        compressed = get_codec(encoding)(body, self.level)
+        self.stats.compress_seconds += time.perf_counter() - start
+        self.stats.misses += 1
+        if len(compressed) >= len(body):
+            # Cache the miss too, so it isn't compressed again.
+            compressed = b""
+        if encoded is None:
+            return compressed or None
+
+        encoded[encoding] = compressed
+        self.size += len(compressed)
+        while self.size > self.max_bytes and len(self._bodies) > 1:
+            evicted, evicted_encoded = self._bodies.popitem(last=False)
+            self.size -= len(evicted)
+            self.size -= sum(map(len, evicted_encoded.values()))
+        return compressed or None
+
+    def _admit(self, body: bytes) -> bool:
+        """Returns whether the body is seen the second time."""
+        key = hash(body)
+        if key in self._candidates:
+            del self._candidates[key]
+            return True
+        self._candidates[key] = None
+        if len(self._candidates) > self.max_candidates:
+            self._candidates.popitem(last=False)
+        return False
+
+    def clear(self) -> None:
+        self._bodies.clear()
+        self._candidates.clear()
+        self.size = 0
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with cached bodies.
+
+    Compresses responses sent with a single body message (regular,
+    not streaming responses) of compressible media types, if they
+    aren't encoded already.
+
+    Args:
+        app: The ASGI application.
+        bodies: Compressed bodies cache.
+        media_types: Compressible media type prefixes.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            bodies: CompressedBodies,
+            media_types: Sequence[str] = COMPRESSIBLE_MEDIA_TYPES,
+    ) -> None:
+        self.app = app
+        self.bodies = bodies
+        self.media_types = tuple(media_types)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+
+        start_message: Message | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if (
+                    headers.get("content-type", "").startswith(
+                        self.media_types
+                    )
+                    and "content-encoding" not in headers
+                    and "content-range" not in headers
+                ):
+                    # Wait for the body to decide on compression.
+                    start_message = message
+                    return
+            elif start_message is not None:
+                start, start_message = start_message, None
+                if (
+                    message["type"] == "http.response.body"
+                    and not message.get("more_body", False)
+                ):
+                    message = self._compress(start, message, accept_encoding)
+                await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compress(
+            self,
+            start: Message,
+            message: Message,
+            accept_encoding: str | None,
+    ) -> Message:
+        body = message.get("body", b"")
+        headers = MutableHeaders(scope=start)
+        if len(body) >= self.bodies.min_size:
+            headers.add_vary_header("Accept-Encoding")
+
+        encoding = self.bodies.select(accept_encoding, len(body))
+        compressed = None
+        if encoding is not None:
+            compressed = self.bodies.compress(body, encoding)
+        if compressed is None:
+            self.bodies.stats.skipped += 1
+            return message
+
+        self.bodies.stats.bytes_in += len(body)
+        self.bodies.stats.bytes_out += len(compressed)
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(compressed))
+        return {**message, "body": compressed}
+
+
+def init_compression(
+        app: FastAPI, bodies: CompressedBodies | None = None
+) -> CompressedBodies:
+    """Installs response compression middleware.
+
+    Args:
+        app: The FastAPI application instance.
+        bodies: Compressed bodies cache. A new one is created if not
+            provided.
+
+    Returns:
+        The installed compressed bodies cache.
+    """
+    bodies = bodies or CompressedBodies()
+    app.add_middleware(CompressionMiddleware, bodies=bodies)
+    return bodies
@@ -0,0 +1,217 @@
+import asyncio
+import contextlib
+import math
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextvars import ContextVar
+from typing import Any
+
+from fastapi import FastAPI
+from sqlalchemy import exc as sa_exc
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Executable
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from fastapi_scaffold.exc import DeadlineExceeded
+from fastapi_scaffold.metrics import EXCEPTION_SCOPE_KEY, UNMATCHED_ROUTE
+
+
+DEADLINE_HEADER = "x-request-timeout"
+"""Request header with the client timeout in seconds."""
+
+_deadline: ContextVar[float | None] = ContextVar(
+    "fastapi_scaffold_deadline", default=None
+)
+
+# Dialect name -> statement setting the current transaction timeout.
+_STATEMENT_TIMEOUT_SQL = {
+    "postgresql": "SET LOCAL statement_timeout = {milliseconds}",
+}
+
+
+def remaining() -> float | None:
+    """Returns seconds left until the request deadline.
+
+    Returns:
+        Remaining time (negative if expired) or `None` without deadline.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline() -> None:
+    """Raises `DeadlineExceeded` if the request deadline expired."""
+    budget = remaining()
+    if budget is not None and budget <= 0:
+        raise DeadlineExceeded()
+
+
+@contextlib.contextmanager
+def deadline(timeout: float | None) -> Iterator[None]:
+    """Sets the deadline within the context.
+
+    A deadline can only be shortened: an earlier outer deadline wins.
+
+    Args:
+        timeout: Seconds from now, no deadline if `None`.
+    """
+    current = _deadline.get()
+    if timeout is not None:
+        new = time.monotonic() + timeout
+        if current is None or new < current:
+            current = new
+    token = _deadline.set(current)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def route_deadline(timeout: float) -> Any:
+    """Creates a FastAPI dependency setting a route default deadline.
+
+    Example:
+        >>> @app.get('/reports', dependencies=[Depends(route_deadline(5))])
+
+    """
+    async def _route_deadline() -> AsyncIterator[None]:
+        with deadline(timeout):
+            yield
+    return _route_deadline
+
+
+@contextlib.asynccontextmanager
+async def deadline_scope(session: AsyncSession) -> AsyncIterator[None]:
+    """Bounds queries within the context by the request deadline.
+
+    Cancels the context when the deadline expires and, for dialects
+    supporting it (PostgreSQL), sets the transaction statement timeout,
+    so the database stops the query too.
+
+    Args:
+        session: The SQLAlchemy session.
+
+    Raises:
+        DeadlineExceeded: The deadline expired.
+    """
+    budget = remaining()
+    if budget is None:
+        yield
+        return
+    if budget <= 0:
+        raise DeadlineExceeded()
+
+    try:
+        async with asyncio.timeout(budget):
+            dialect = session.get_bind().dialect.name
+            if (sql := _STATEMENT_TIMEOUT_SQL.get(dialect)) is not None:
+                milliseconds = max(math.ceil(budget * 1000), 1)
+                await session.execute(
+                    text(sql.format(milliseconds=milliseconds))
+                )
+            yield
+    except TimeoutError:
+        raise DeadlineExceeded()
+    except sa_exc.DBAPIError:
+        # Database statement timeout.
+        if (budget := remaining()) is not None and budget <= 0:
+            raise DeadlineExceeded()
+        raise
+
+
+async def execute(
+        session: AsyncSession, statement: Executable, **kwargs: Any
+) -> Any:
+    """`session.execute` bounded by the request deadline."""
+    async with deadline_scope(session):
+        return await session.execute(statement, **kwargs)
+
+
+class Deadlines:
+    """Request deadlines configuration and counters.
+
+    Args:
+        default: Default request timeout in seconds, no deadline if
+            not provided.
+        header: Request header with a client timeout in seconds.
+        max_timeout: Upper bound of a client timeout.
+
+    Attributes:
+        expired: Number of requests failed with an expired deadline by
+            route templates.
+    """
+
+    def __init__(
+            self,
+            default: float | None = None,
+            header: str = DEADLINE_HEADER,
+            max_timeout: float | None = None,
+    ) -> None:
+        self.default = default
+        self.header = header.lower().encode("latin-1")
+        self.max_timeout = max_timeout
+        self.expired: dict[str, int] = {}
+
+    def timeout(self, scope: Scope) -> float | None:
+        """Returns the request timeout from headers or the default one."""
+        for name, value in scope["headers"]:
+            if name == self.header:
+                try:
+                    timeout = float(value)
+                except ValueError:
+                    break
+                if not math.isfinite(timeout) or timeout < 0:
+                    break
+                if self.max_timeout is not None:
+                    timeout = min(timeout, self.max_timeout)
+                return timeout
+        return self.default
+
+
+class DeadlineMiddleware:
+    """ASGI middleware setting the request deadline.
+
+    Args:
+        app: The ASGI application.
+        deadlines: Deadlines configuration.
+    """
+
+    def __init__(self, app: ASGIApp, deadlines: Deadlines) -> None:
+        self.app = app
+        self.deadlines = deadlines
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with deadline(self.deadlines.timeout(scope)):
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                exception = scope.get(EXCEPTION_SCOPE_KEY)
+                if exception == DeadlineExceeded.__name__:
+                    route = getattr(scope.get("route"), "path", None)
+                    route = route or UNMATCHED_ROUTE
+                    expired = self.deadlines.expired
+                    expired[route] = expired.get(route, 0) + 1
+
+
+def init_deadlines(
+        app: FastAPI, deadlines: Deadlines | None = None
+) -> Deadlines:
+    """Installs request deadlines middleware.
+
+    Args:
+        app: The FastAPI application instance.
+        deadlines: Deadlines configuration. Default one if not provided.
+
+    Returns:
+        The installed deadlines configuration.
+    """
+    deadlines = deadlines or Deadlines()
+    app.add_middleware(DeadlineMiddleware, deadlines=deadlines)
+    return deadlines
@@ -95,6 +95,26 @@ class InternalServerError(ScaffoldException):
         super().__init__(message, status_code, headers)
 
 
+class GatewayTimeout(ScaffoldException):
+    def __init__(
+            self,
+            message: str = "Gateway Timeout",
+            status_code: int | HTTPStatus = HTTPStatus.GATEWAY_TIMEOUT,
+            headers: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(message, status_code, headers)
+
+
+class DeadlineExceeded(GatewayTimeout):
+    def __init__(
+            self,
+            message: str = "Request deadline exceeded",
+            status_code: int | HTTPStatus = HTTPStatus.GATEWAY_TIMEOUT,
+            headers: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(message, status_code, headers)
+
+
 class ErrorType(StrEnum):
     """Pydantic type error.
 
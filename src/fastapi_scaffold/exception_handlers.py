@@ -1,13 +1,17 @@
+import functools
 import http
+import inspect
 import traceback
 from typing import Callable, Type
 
-from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi import FastAPI, Request, Response, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from fastapi_scaffold.http_responses import Response500, http_responses
+from fastapi_scaffold.metrics import EXCEPTION_SCOPE_KEY
 from fastapi_scaffold.responses import (
     BaseResponse,
     DebugErrorResponse,
@@ -18,6 +22,17 @@ from fastapi_scaffold.responses import (
 type ExceptionHandler = Callable[[Request, Exception], Response]
 
 
+def _record_exception(handler: ExceptionHandler) -> ExceptionHandler:
+    """Marks the request with a handled exception class for metrics."""
+    @functools.wraps(handler)
+    async def wrapper(request: Request, exc: Exception) -> Response:
+        request.scope[EXCEPTION_SCOPE_KEY] = type(exc).__name__
+        if inspect.iscoroutinefunction(handler):
+            return await handler(request, exc)
+        return await run_in_threadpool(handler, request, exc)
+    return wrapper
+
+
 async def debug_exception_handler(
         request: Request, exc: Exception
 ) -> JSONResponse:
@@ -92,6 +107,7 @@ async def http_exception_handler(
     return JSONResponse(
         status_code=exc.status_code,
         content=response.model_dump(mode="json"),
+        headers=exc.headers,
     )
 
 
@@ -108,19 +124,28 @@ def init_exc_handlers(
     """Initialize exception handlers for the FastAPI application.
 
     Sets up handlers for:
-        - HTTPException: with `Response<code>` responses,
+        - HTTPException (including `ScaffoldException`): with
+            `Response<code>` responses,
         - RequestValidationError: with `ValidationErrorResponse` format,
         - Exception: with 500 http status (and trace if app.debug = True).
 
     Args:
         app: The FastAPI application instance.
     """
-    app.add_exception_handler(HTTPException, http_exception_handler)
-    app.add_exception_handler(RequestValidationError, validation_error_handler)
+    app.add_exception_handler(
+        StarletteHTTPException, _record_exception(http_exception_handler)
+    )
+    app.add_exception_handler(
+        RequestValidationError, _record_exception(validation_error_handler)
+    )
     if debug:
-        app.add_exception_handler(Exception, debug_exception_handler)
+        app.add_exception_handler(
+            Exception, _record_exception(debug_exception_handler)
+        )
     else:
-        app.add_exception_handler(Exception, exception_handler)
+        app.add_exception_handler(
+            Exception, _record_exception(exception_handler)
+        )
 
 
 def init_responses(
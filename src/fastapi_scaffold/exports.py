@@ -0,0 +1,393 @@
+import asyncio
+import contextlib
+import os
+import time
+import uuid
+from collections.abc import Callable
+from enum import StrEnum
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Self
+
+import anyio
+import sqlalchemy as sa
+from fastapi import Request
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from fastapi_scaffold.exc import ResourceNotFound, ScaffoldException
+from fastapi_scaffold.responses import DataResponse, Schema
+from fastapi_scaffold.sorting import Model, SortParams, sort
+
+
+type SessionFactory = Callable[[], AsyncSession]
+
+EXPORT_MEDIA_TYPE = "application/x-ndjson"
+
+
+class ExportStatus(StrEnum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class ExportJob(Schema):
+    """Export job state schema."""
+
+    id: str = Field(..., description="Export job ID")
+    status: ExportStatus = Field(..., description="Export job status")
+    rows: int = Field(0, description="Number of exported rows", ge=0)
+    size: int = Field(0, description="Export file size in bytes", ge=0)
+    error: str | None = Field(None, description="Export error message")
+
+
+class ExportJobResponse(DataResponse[ExportJob]):
+    """Export job response schema (`202 Accepted` on creation)."""
+    message: str = HTTPStatus.ACCEPTED.phrase
+
+
+class _ExportTask:
+    def __init__(
+            self,
+            job: ExportJob,
+            statement: sa.Select[Any],
+            schema: type[BaseModel],
+    ) -> None:
+        self.job = job
+        self.statement = statement
+        self.schema = schema
+        self.finished_at: float | None = None
+
+
+class ExportManager:
+    """Runs background exports of query results to local files.
+
+    Query results are streamed to `<directory>/<job_id>.ndjson` as
+    JSON lines by a pool of in-process workers. Finished files are
+    served with `Range` requests support (see `file_response`), so
+    clients can resume downloads.
+
+    Jobs, their queue and files are local to the process: with several
+    server workers, status and file requests must reach the worker the
+    job was submitted to (e.g. run exports in a single-worker service).
+
+    Use it as an async context manager (e.g. in the app lifespan) to
+    start and stop the workers.
+
+    Args:
+        session_factory: Sessions factory (e.g. `async_sessionmaker`).
+        directory: A directory for export files.
+        workers: Number of concurrently running exports.
+        max_queued: Maximum number of queued jobs, `submit` waits when
+            the queue is full. Unlimited if 0.
+        chunk_size: Number of rows fetched and written at once.
+        retention: Seconds to keep finished jobs and their files.
+    """
+
+    def __init__(
+            self,
+            session_factory: SessionFactory,
+            directory: str | os.PathLike,
+            workers: int = 2,
+            max_queued: int = 0,
+            chunk_size: int = 1000,
+            retention: float = 3600,
+    ) -> None:
+        self.session_factory = session_factory
+        self.directory = Path(directory)
+        self.workers = workers
+        self._queue: asyncio.Queue[str] = asyncio.Queue(max_queued)
+        self.chunk_size = chunk_size
+        self.retention = retention
+        self._tasks: dict[str, _ExportTask] = {}
+        self._workers: list[asyncio.Task[None]] = []
+
+    async def __aenter__(self) -> Self:
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.stop()
+
+    def start(self) -> None:
+        """Starts the workers."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for _ in range(self.workers):
+            self._workers.append(asyncio.create_task(self._work()))
+
+    async def stop(self) -> None:
+        """Cancels the workers."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    async def submit(
+            self,
+            statement: sa.Select[Any],
+            schema: type[BaseModel],
+            *,
+            sorting: SortParams | None = None,
+            model: Model | None = None,
+    ) -> ExportJob:
+        """Enqueues an export of the statement results.
+
+        Args:
+            statement: The SQLAlchemy `SELECT` statement to export.
+            schema: The schema every row is exported with.
+            sorting: Sorting params.
+            model: Sorting model (see `sort`).
+
+        Returns:
+            The pending export job.
+        """
+        self._cleanup()
+        if sorting is not None:
+            statement = sort(statement, sorting=sorting, model=model)
+        job = ExportJob(id=uuid.uuid4().hex, status=ExportStatus.pending)
+        self._tasks[job.id] = _ExportTask(job, statement, schema)
+        await self._queue.put(job.id)
+        return job
+
+    def get(self, job_id: str) -> ExportJob:
+        """Gets export job state.
+
+        Raises:
+            ResourceNotFound: Unknown or expired job.
+        """
+        try:
+            return self._tasks[job_id].job
+        except KeyError:
+            raise ResourceNotFound(f"Export {job_id} isn't found")
+
+    def path(self, job_id: str) -> Path:
+        """Returns the export file path."""
+        return self.directory / f"{job_id}.ndjson"
+
+    def file_response(self, job_id: str, request: Request) -> Response:
+        """Returns the finished export file response.
+
+        Supports a single `bytes` range: returns `206 Partial Content`
+        for satisfiable ranges and full `200 OK` file otherwise.
+
+        Raises:
+            ResourceNotFound: Unknown or expired job.
+            ScaffoldException: The job isn't finished (409) or the
+                requested range isn't satisfiable (416).
+        """
+        job = self.get(job_id)
+        if job.status != ExportStatus.done:
+            raise ScaffoldException(
+                f"Export {job_id} is {job.status}", HTTPStatus.CONFLICT
+            )
+        etag = f'"{job.id}-{job.size}"'
+        byte_range = None
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and (if_range is None or if_range == etag):
+            byte_range = parse_range(range_header, job.size)
+        return RangeFileResponse(
+            self.path(job_id),
+            size=job.size,
+            byte_range=byte_range,
+            headers={"ETag": etag},
+            media_type=EXPORT_MEDIA_TYPE,
+        )
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            # Only finished jobs expire, so a queued job always exists.
+            await self._export(self._tasks[job_id])
+
+    async def _export(self, task: _ExportTask) -> None:
+        job = task.job
+        job.status = ExportStatus.running
+        path = self.path(job.id)
+        part_path = path.with_suffix(".part")
+        try:
+            with open(part_path, "wb") as file:
+                async with self.session_factory() as session:
+                    result = await session.stream(
+                        task.statement.execution_options(
+                            yield_per=self.chunk_size
+                        )
+                    )
+                    async for rows in result.partitions(self.chunk_size):
+                        chunk = b"".join(
+                            task.schema.model_validate(
+                                _row_value(row)
+                            ).model_dump_json().encode() + b"\n"
+                            for row in rows
+                        )
+                        await run_in_threadpool(file.write, chunk)
+                        job.rows += len(rows)
+                        job.size += len(chunk)
+            os.replace(part_path, path)
+        except asyncio.CancelledError:
+            part_path.unlink(missing_ok=True)
+            job.status = ExportStatus.failed
+            job.error = "Cancelled"
+            raise
+        except Exception as exc:
+            part_path.unlink(missing_ok=True)
+            job.status = ExportStatus.failed
+            job.error = str(exc)
+        else:
+            job.status = ExportStatus.done
+        finally:
+            task.finished_at = time.monotonic()
+
+    def _cleanup(self) -> None:
+        now = time.monotonic()
+        for job_id, task in list(self._tasks.items()):
+            if (
+                task.finished_at is not None
+                and now - task.finished_at > self.retention
+            ):
+                del self._tasks[job_id]
+                with contextlib.suppress(OSError):
+                    self.path(job_id).unlink()
+
+
+def _row_value(row: sa.Row[Any]) -> Any:
+    values = row._tuple()
+    if len(values) == 1:
+        return values[0]
+    return dict(row._mapping)
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Parses `Range` header value.
+
+    Args:
+        header: The `Range` header value.
+        size: The resource size in bytes.
+
+    Returns:
+        Inclusive start and end byte positions or `None` if the header
+        must be ignored (invalid or multiple ranges).
+
+    Raises:
+        ScaffoldException: The range isn't satisfiable (416).
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    start_str, sep, end_str = ranges.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+        else:
+            # Suffix range: the last N bytes.
+            start, end = max(size - int(end_str), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise ScaffoldException(
+            f"Range {header} isn't satisfiable",
+            HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(Response):
+    """File response for a whole file or a single bytes range.
+
+    Uses ASGI `http.response.zerocopy` (or `http.response.pathsend` for
+    whole files) extensions when the server supports them, otherwise
+    reads the file in chunks.
+
+    Args:
+        path: The file path.
+        size: The file size in bytes.
+        byte_range: Inclusive start and end positions to send with
+            `206 Partial Content`, the whole file if not provided.
+        headers: Additional headers.
+        media_type: The response media type.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+            self,
+            path: str | os.PathLike,
+            size: int,
+            byte_range: tuple[int, int] | None = None,
+            headers: dict[str, str] | None = None,
+            media_type: str | None = None,
+    ) -> None:
+        self.path = Path(path)
+        if byte_range is None:
+            self.offset, self.count = 0, size
+            status_code = HTTPStatus.OK
+        else:
+            self.offset = byte_range[0]
+            self.count = byte_range[1] - byte_range[0] + 1
+            status_code = HTTPStatus.PARTIAL_CONTENT
+        super().__init__(
+            status_code=status_code, headers=headers, media_type=media_type
+        )
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["content-length"] = str(self.count)
+        if byte_range is not None:
+            self.headers["content-range"] = (
+                f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+            )
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions", {})
+        if "http.response.zerocopy" in extensions:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+            return
+        if (
+            "http.response.pathsend" in extensions
+            and self.status_code == HTTPStatus.OK
+        ):
+            await send({
+                "type": "http.response.pathsend", "path": str(self.path)
+            })
+            return
+
+        async with await anyio.open_file(self.path, "rb") as file:
+            await file.seek(self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": True,
+                })
+        await send({"type": "http.response.body", "body": b""})
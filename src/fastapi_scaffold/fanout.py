@@ -0,0 +1,122 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Mapping
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_scaffold.exc import (
+    GatewayTimeout,
+    ResourceAlreadyExists,
+    ResourceNotFound,
+    ScaffoldException,
+)
+
+
+type Lookup = Callable[[AsyncSession], Awaitable[Any]]
+type SessionFactory = Callable[[], AsyncSession]
+type ErrorMap = Mapping[type[Exception], type[ScaffoldException]]
+
+
+DEFAULT_ERROR_MAP: ErrorMap = {
+    sa_exc.NoResultFound: ResourceNotFound,
+    sa_exc.IntegrityError: ResourceAlreadyExists,
+    TimeoutError: GatewayTimeout,
+}
+"""Lookup errors to scaffold exceptions mapping, checked in order."""
+
+
+class _LookupFailed(Exception):
+    def __init__(self, name: str, error: Exception) -> None:
+        self.name = name
+        self.error = error
+
+
+def _to_scaffold_exception(
+        name: str, error: Exception, error_map: ErrorMap
+) -> Exception:
+    if isinstance(error, ScaffoldException):
+        return error
+    for error_cls, exception_cls in error_map.items():
+        if isinstance(error, error_cls):
+            return exception_cls(f"{name}: {exception_cls().message}")
+    return error
+
+
+async def gather_data[Data: BaseModel](
+        session_factory: SessionFactory,
+        data_model: type[Data],
+        lookups: Mapping[str, Lookup],
+        *,
+        limit: int | None = None,
+        timeout: float | None = None,
+        error_map: ErrorMap = DEFAULT_ERROR_MAP,
+) -> Data:
+    """Runs independent lookups concurrently and builds data model.
+
+    Every lookup gets its own session from `session_factory`, because
+    a single `AsyncSession` can't run queries concurrently.
+
+    Args:
+        session_factory: Sessions factory (e.g. `async_sessionmaker`).
+        data_model: The schema to build from lookups results.
+        lookups: Async callables accepting a session by `data_model`
+            field names.
+        limit: Maximum number of concurrently running lookups.
+        timeout: Timeout in seconds for all lookups.
+        error_map: Maps lookup errors to scaffold exceptions.
+
+    Returns:
+        The `data_model` instance with lookups results as fields.
+
+    Raises:
+        ScaffoldException: A lookup failed with a mapped error or
+            lookups timed out (`GatewayTimeout`).
+        Exception: A lookup failed with an unmapped error.
+
+    Example:
+        >>> data = await gather_data(
+        ...     async_session,
+        ...     UserData,
+        ...     {
+        ...         "user": lambda s: s.get_one(User, user_id),
+        ...         "address": lambda s: s.scalar(address_stmt),
+        ...     },
+        ...     limit=4,
+        ...     timeout=2,
+        ... )
+        >>> return DataResponse(data=data)
+
+    """
+    semaphore = asyncio.Semaphore(limit or len(lookups) or 1)
+
+    async def run(name: str, lookup: Lookup) -> Any:
+        async with semaphore:
+            try:
+                async with session_factory() as session:
+                    return await lookup(session)
+            except Exception as error:
+                raise _LookupFailed(name, error) from error
+
+    tasks: dict[str, asyncio.Task[Any]] = {}
+    try:
+        async with asyncio.timeout(timeout):
+            async with asyncio.TaskGroup() as group:
+                for name, lookup in lookups.items():
+                    tasks[name] = group.create_task(run(name, lookup))
+    except TimeoutError:
+        pending = ", ".join(
+            name for name, task in tasks.items() if task.cancelled()
+        )
+        raise GatewayTimeout(f"Lookups timed out: {pending}") from None
+    except BaseExceptionGroup as group_error:
+        failed = group_error.exceptions[0]
+        if not isinstance(failed, _LookupFailed):
+            raise
+        error = _to_scaffold_exception(failed.name, failed.error, error_map)
+        if error is failed.error:
+            raise error from None
+        raise error from failed.error
+
+    return data_model(**{name: task.result() for name, task in tasks.items()})
@@ -0,0 +1,279 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Mapping
+from enum import IntEnum
+from http import HTTPStatus
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from fastapi_scaffold.http_responses import http_responses
+from fastapi_scaffold.metrics import EXCEPTION_SCOPE_KEY, UNMATCHED_ROUTE
+
+
+class Priority(IntEnum):
+    """Request priority class, lower value is more important."""
+    critical = 0
+    normal = 1
+    sheddable = 2
+
+
+DEFAULT_PRIORITY_SHARES: Mapping[Priority, float] = {
+    Priority.critical: 1.0,
+    Priority.normal: 0.9,
+    Priority.sheddable: 0.5,
+}
+"""Share of a concurrency limit available for each priority class."""
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit adjusted by observed latency.
+
+    The limit grows by `increase / limit` for every request completed
+    within `latency_target` and is multiplied by `backoff` (at most
+    once per `latency_target`) when a request is slower or fails.
+
+    Args:
+        initial: The initial limit.
+        min_limit: The limit lower bound.
+        max_limit: The limit upper bound.
+        latency_target: Acceptable request latency in seconds.
+        backoff: Multiplicative decrease factor.
+        increase: Additive increase per limit of successful requests.
+        priority_shares: Share of the limit available for each
+            priority class, so less important requests are shed first.
+    """
+
+    def __init__(
+            self,
+            initial: int = 20,
+            min_limit: int = 1,
+            max_limit: int = 1000,
+            latency_target: float = 1.0,
+            backoff: float = 0.9,
+            increase: float = 1.0,
+            priority_shares: Mapping[Priority, float] = (
+                DEFAULT_PRIORITY_SHARES
+            ),
+    ) -> None:
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.increase = increase
+        self.priority_shares = priority_shares
+        self.inflight = 0
+        self.shed = 0
+        self._last_decrease = 0.0
+
+    def acquire(self, priority: Priority = Priority.normal) -> bool:
+        """Takes a slot for a request if the limit allows it."""
+        share = self.priority_shares.get(priority, 1.0)
+        if self.inflight >= max(self.limit * share, 1):
+            self.shed += 1
+            return False
+        self.inflight += 1
+        return True
+
+    def release(self, latency: float, failed: bool = False) -> None:
+        """Releases a slot and adjusts the limit.
+
+        Args:
+            latency: The request latency in seconds.
+            failed: The request failed because of overload.
+        """
+        self.inflight -= 1
+        if failed or latency > self.latency_target:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.latency_target:
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+        else:
+            self.limit = min(
+                self.max_limit, self.limit + self.increase / self.limit
+            )
+
+
+OVERFLOW_GROUP = "<other>"
+"""Group of requests over the `LoadShedder.max_groups` limit."""
+
+
+class RouteGroups:
+    """Groups requests by the matched route template (`/users/{id}`).
+
+    Requests not matching any route share one group, so the number of
+    groups is bounded by the number of routes. Matching every route is
+    costly for large applications, so groups are cached by the request
+    method and path (LRU).
+
+    Args:
+        maxsize: Number of cached paths.
+    """
+
+    def __init__(self, maxsize: int = 10_000) -> None:
+        self.maxsize = maxsize
+        self._groups: OrderedDict[Hashable, str] = OrderedDict()
+
+    def __call__(self, scope: Scope) -> str:
+        router = getattr(scope.get("app"), "router", None)
+        routes = getattr(router, "routes", ())
+        # Routes added later (e.g. on startup) change matching.
+        key = (id(router), len(routes), scope["method"], scope["path"])
+        group = self._groups.get(key)
+        if group is not None:
+            self._groups.move_to_end(key)
+            return group
+
+        group = UNMATCHED_ROUTE
+        for route in routes:
+            match, _ = route.matches(scope)
+            if match is not Match.NONE:
+                group = route.path
+                break
+        self._groups[key] = group
+        if len(self._groups) > self.maxsize:
+            self._groups.popitem(last=False)
+        return group
+
+
+group_by_route = RouteGroups()
+"""Groups requests by the matched route template, see `RouteGroups`."""
+
+
+def group_by_path_prefix(scope: Scope) -> str:
+    """Groups requests by the first path segment (`/users/1` - `users`).
+
+    Any client path creates a group, use with `LoadShedder.max_groups`.
+    """
+    return scope["path"].lstrip("/").partition("/")[0]
+
+
+def default_priority(scope: Scope) -> Priority:
+    return Priority.normal
+
+
+class LoadShedder:
+    """Adaptive concurrency limits by route groups.
+
+    Args:
+        group_by: Returns a route group for an ASGI scope. The matched
+            route template by default.
+        priority_by: Returns a priority class for an ASGI scope.
+            `Priority.normal` for all requests by default.
+        status_code: Status code of rejected requests, 503 or 429.
+        retry_after: `Retry-After` header value in seconds.
+        max_groups: Number of groups with own limits, requests of other
+            groups share one limit.
+        **limit_kwargs: `AdaptiveLimit` arguments for every group.
+    """
+
+    def __init__(
+            self,
+            group_by: Callable[[Scope], str] = group_by_route,
+            priority_by: Callable[[Scope], Priority] = default_priority,
+            status_code: int = HTTPStatus.SERVICE_UNAVAILABLE,
+            retry_after: int = 1,
+            max_groups: int = 1000,
+            **limit_kwargs: Any,
+    ) -> None:
+        if status_code not in (
+            HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.TOO_MANY_REQUESTS
+        ):
+            raise ValueError(f"Invalid load shedding status {status_code}")
+        self.group_by = group_by
+        self.priority_by = priority_by
+        self.max_groups = max_groups
+        self.limit_kwargs = limit_kwargs
+        self.groups: dict[str, AdaptiveLimit] = {}
+
+        # Rejection response is the same every time, render it once.
+        self.rejection = JSONResponse(
+            status_code=int(status_code),
+            content=http_responses[status_code]().model_dump(mode="json"),
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def get_limit(self, group: str) -> AdaptiveLimit:
+        if (limit := self.groups.get(group)) is None:
+            if len(self.groups) >= self.max_groups:
+                group = OVERFLOW_GROUP
+                if (limit := self.groups.get(group)) is not None:
+                    return limit
+            limit = self.groups[group] = AdaptiveLimit(**self.limit_kwargs)
+        return limit
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        """Returns current limits, in-flight and shed requests by groups."""
+        return {
+            group: {
+                "limit": limit.limit,
+                "inflight": limit.inflight,
+                "shed": limit.shed,
+            }
+            for group, limit in self.groups.items()
+        }
+
+
+class LoadSheddingMiddleware:
+    """ASGI middleware rejecting requests over adaptive limits.
+
+    Rejected requests get the scaffold error response with
+    `Retry-After` header before the application handles them.
+
+    Args:
+        app: The ASGI application.
+        shedder: Load shedder with limits configuration.
+    """
+
+    def __init__(self, app: ASGIApp, shedder: LoadShedder) -> None:
+        self.app = app
+        self.shedder = shedder
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.shedder.get_limit(self.shedder.group_by(scope))
+        if not limit.acquire(self.shedder.priority_by(scope)):
+            scope[EXCEPTION_SCOPE_KEY] = "LoadShed"
+            await self.shedder.rejection(scope, receive, send)
+            return
+
+        status_code = HTTPStatus.INTERNAL_SERVER_ERROR
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            limit.release(
+                time.perf_counter() - start,
+                failed=status_code >= HTTPStatus.INTERNAL_SERVER_ERROR,
+            )
+
+
+def init_load_shedding(
+        app: FastAPI, shedder: LoadShedder | None = None
+) -> LoadShedder:
+    """Installs load shedding middleware.
+
+    Args:
+        app: The FastAPI application instance.
+        shedder: Load shedder. A new one is created if not provided.
+
+    Returns:
+        The installed load shedder.
+    """
+    shedder = shedder or LoadShedder()
+    app.add_middleware(LoadSheddingMiddleware, shedder=shedder)
+    return shedder
@@ -0,0 +1,344 @@
+import asyncio
+import atexit
+import json
+import math
+import os
+import time
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+type Labels = tuple[str, ...]
+
+EXCEPTION_SCOPE_KEY = "fastapi_scaffold.exception"
+"""Request scope key the exception handlers put a handled error class to."""
+
+UNMATCHED_ROUTE = "<unmatched>"
+"""Route label for requests that didn't match any route."""
+
+DEFAULT_BUCKETS: Sequence[float] = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25,
+    0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, math.inf,
+)
+"""Default latency histogram buckets in seconds."""
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Metrics:
+    """Per-process request counters and latency histograms.
+
+    Counters are plain dicts updated from the event loop thread without
+    awaiting, so no locks are needed. Metrics are keyed by route
+    template (`/users/{user_id}`), status code and exception class.
+
+    In multiprocess mode (`multiprocess_dir` is set) every worker
+    periodically dumps its state to `<multiprocess_dir>/<pid>.json`
+    and the exposition sums the state of all workers. The state is
+    dumped by a background task started on the first request, so idle
+    workers report their last requests too, and at the process exit.
+    The directory must be shared by the workers and wiped before the
+    server starts.
+
+    Args:
+        buckets: Latency histogram buckets in seconds (sorted, the last
+            one is `inf`).
+        multiprocess_dir: A directory for per-process state files.
+        flush_interval: Time in seconds between state dumps.
+        prefix: Metric names prefix.
+    """
+
+    def __init__(
+            self,
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+            multiprocess_dir: str | os.PathLike | None = None,
+            flush_interval: float = 1.0,
+            prefix: str = "scaffold",
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        if self.buckets[-1] != math.inf:
+            self.buckets += (math.inf,)
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self.multiprocess_dir = None
+        if multiprocess_dir is not None:
+            self.multiprocess_dir = Path(multiprocess_dir)
+            self.multiprocess_dir.mkdir(parents=True, exist_ok=True)
+            atexit.register(self.flush)
+
+        # (method, route, status) -> count
+        self._requests: dict[Labels, int] = {}
+        # (method, route, status, exception) -> count
+        self._errors: dict[Labels, int] = {}
+        # (method, route, status) -> [*bucket counts, sum]
+        self._durations: dict[Labels, list[float]] = {}
+        self._last_flush = 0.0
+        self._dirty = False
+        self._flusher: asyncio.Task[None] | None = None
+
+    def observe(
+            self,
+            method: str,
+            route: str,
+            status_code: int,
+            duration: float,
+            exception: str | None = None,
+    ) -> None:
+        """Records a finished request.
+
+        Args:
+            method: The HTTP method.
+            route: The route template.
+            status_code: The response status code.
+            duration: Request handling time in seconds.
+            exception: A class name of the handled exception, if any.
+        """
+        key = (method, route, str(status_code))
+        self._requests[key] = self._requests.get(key, 0) + 1
+        if exception is not None:
+            error_key = (*key, exception)
+            self._errors[error_key] = self._errors.get(error_key, 0) + 1
+
+        histogram = self._durations.get(key)
+        if histogram is None:
+            histogram = self._durations[key] = [0] * len(self.buckets) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if duration <= bound:
+                histogram[i] += 1
+                break
+        histogram[-1] += duration
+
+        if self.multiprocess_dir is not None:
+            self._dirty = True
+            self._start_flusher()
+
+    def _start_flusher(self) -> None:
+        if self._flusher is not None and not self._flusher.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to flush in background, flush on requests.
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self._last_flush = now
+                self.flush()
+            return
+        self._flusher = loop.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._dirty:
+                self.flush()
+
+    def _state(self) -> dict[str, list[list[Any]]]:
+        return {
+            "requests": [[*k, v] for k, v in self._requests.items()],
+            "errors": [[*k, v] for k, v in self._errors.items()],
+            "durations": [[*k, v] for k, v in self._durations.items()],
+        }
+
+    def flush(self) -> None:
+        """Dumps the process state to the multiprocess directory."""
+        if self.multiprocess_dir is None:
+            return
+        self._dirty = False
+        path = self.multiprocess_dir / f"{os.getpid()}.json"
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._state()))
+        os.replace(tmp_path, path)
+
+    def _collect(self) -> tuple[
+        dict[Labels, int], dict[Labels, int], dict[Labels, list[float]]
+    ]:
+        if self.multiprocess_dir is None:
+            return self._requests, self._errors, self._durations
+
+        states = [self._state()]
+        own_file = f"{os.getpid()}.json"
+        for path in self.multiprocess_dir.glob("*.json"):
+            if path.name == own_file:
+                continue
+            try:
+                states.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # The file is being replaced by its worker.
+
+        requests: dict[Labels, int] = {}
+        errors: dict[Labels, int] = {}
+        durations: dict[Labels, list[float]] = {}
+        for state in states:
+            for *key, value in state["requests"]:
+                key = tuple(key)
+                requests[key] = requests.get(key, 0) + value
+            for *key, value in state["errors"]:
+                key = tuple(key)
+                errors[key] = errors.get(key, 0) + value
+            for *key, value in state["durations"]:
+                key = tuple(key)
+                if len(value) != len(self.buckets) + 1:
+                    continue  # Worker with different buckets.
+                if (histogram := durations.get(key)) is None:
+                    durations[key] = list(value)
+                else:
+                    for i, v in enumerate(value):
+                        histogram[i] += v
+        return requests, errors, durations
+
+    def render(self) -> str:
+        """Renders metrics in the Prometheus text exposition format."""
+        requests, errors, durations = self._collect()
+        request_labels = ("method", "route", "status")
+        lines: list[str] = []
+
+        name = f"{self.prefix}_requests_total"
+        lines.append(f"# HELP {name} Total number of handled requests.")
+        lines.append(f"# TYPE {name} counter")
+        for key, value in sorted(requests.items()):
+            lines.append(f"{name}{_labels(request_labels, key)} {value}")
+
+        name = f"{self.prefix}_errors_total"
+        lines.append(f"# HELP {name} Total number of handled exceptions.")
+        lines.append(f"# TYPE {name} counter")
+        for key, value in sorted(errors.items()):
+            labels = _labels((*request_labels, "exception"), key)
+            lines.append(f"{name}{labels} {value}")
+
+        name = f"{self.prefix}_request_duration_seconds"
+        lines.append(f"# HELP {name} Request handling time in seconds.")
+        lines.append(f"# TYPE {name} histogram")
+        for key, histogram in sorted(durations.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram):
+                cumulative += count
+                labels = _labels(
+                    (*request_labels, "le"), (*key, _format_bound(bound))
+                )
+                lines.append(f"{name}_bucket{labels} {int(cumulative)}")
+            labels = _labels(request_labels, key)
+            lines.append(f"{name}_sum{labels} {histogram[-1]}")
+            lines.append(f"{name}_count{labels} {int(cumulative)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    )
+
+
+def _labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = (f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+def _route_template(scope: Scope, path: str, root_path: str) -> str:
+    """Returns the template of the route that handled the request.
+
+    Args:
+        scope: The ASGI scope after the request is handled.
+        path: The request path before routing.
+        root_path: The root path before routing.
+    """
+    # Mounted applications append the mount path to the root path.
+    mount_path = scope.get("root_path", "")[len(root_path):]
+    if (route := scope.get("route")) is not None:
+        return mount_path + route.path
+
+    # Routes not putting themselves to the scope (`/openapi.json`,
+    # `/docs`, mounted applications) are matched again.
+    scope = {**scope, "path": path, "root_path": root_path}
+    router = getattr(scope.get("app"), "router", None)
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match is not Match.NONE:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ASGI middleware that feeds `Metrics` with every HTTP request.
+
+    Args:
+        app: The ASGI application.
+        metrics: Metrics storage.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: Metrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        # Mounted applications change paths in the scope.
+        path, root_path = scope["path"], scope.get("root_path", "")
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        exception = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            # Uncaught errors are handled by the outermost middleware.
+            status_code = 500
+            exception = type(exc).__name__
+            raise
+        finally:
+            self.metrics.observe(
+                method=scope["method"],
+                route=_route_template(scope, path, root_path),
+                status_code=status_code,
+                duration=time.perf_counter() - start,
+                exception=exception or scope.get(EXCEPTION_SCOPE_KEY),
+            )
+
+
+def init_metrics(
+        app: FastAPI,
+        metrics: Metrics | None = None,
+        path: str | None = "/metrics",
+) -> Metrics:
+    """Installs metrics middleware and the Prometheus endpoint.
+
+    Args:
+        app: The FastAPI application instance.
+        metrics: Metrics storage. A new one is created if not provided.
+        path: The metrics endpoint path. The endpoint isn't mounted
+            if `None`.
+
+    Returns:
+        The installed metrics storage.
+    """
+    metrics = metrics or Metrics()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    if path is not None:
+        async def get_metrics(request: Request) -> PlainTextResponse:
+            return PlainTextResponse(
+                metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE
+            )
+        app.add_api_route(
+            path, get_metrics, methods=["GET"], include_in_schema=False
+        )
+    return metrics
@@ -0,0 +1,371 @@
+import argparse
+import contextlib
+import hashlib
+import importlib
+import json
+import os
+import re
+import typing
+from collections.abc import AsyncIterator
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+import fastapi
+import pydantic
+from fastapi import FastAPI
+from fastapi.dependencies.models import Dependant
+from fastapi.dependencies.utils import get_flat_params
+from fastapi.routing import APIRoute
+from fastapi.security.base import SecurityBase
+from pydantic import BaseModel
+
+
+type OpenAPISchema = dict[str, Any]
+
+_SCHEMAS_REF_PREFIX = "#/components/schemas/"
+_MEMORY_ADDRESS_RE = re.compile(r" at 0x[0-9a-fA-F]+")
+
+
+def _type_signature(annotation: Any, seen: set[type]) -> Any:
+    """Returns a JSON-able signature of a type annotation.
+
+    Pydantic models are expanded to their config and fields, and enums
+    to their members, so a change in any nested schema changes the
+    signature.
+    """
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return [
+            f"{annotation.__module__}.{annotation.__qualname__}",
+            annotation.__doc__,
+            [
+                [name, repr(member.value)]
+                for name, member in annotation.__members__.items()
+            ],
+        ]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        name = f"{annotation.__module__}.{annotation.__qualname__}"
+        if annotation in seen:
+            return name
+        seen.add(annotation)
+        return [
+            name,
+            annotation.__doc__,
+            _value_signature(dict(annotation.model_config)),
+            [
+                [
+                    field_name,
+                    repr(field),
+                    _type_signature(field.annotation, seen),
+                ]
+                for field_name, field in annotation.model_fields.items()
+            ],
+        ]
+    args = typing.get_args(annotation)
+    if args:
+        return [
+            repr(typing.get_origin(annotation)),
+            [_type_signature(arg, seen) for arg in args],
+        ]
+    return repr(annotation)
+
+
+def _value_signature(value: Any) -> Any:
+    """Returns a JSON-able signature of a value, including functions
+    (e.g. `json_schema_extra`) code.
+    """
+    if isinstance(value, dict):
+        return {str(k): _value_signature(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_value_signature(v) for v in value]
+    if (code := getattr(value, "__code__", None)) is not None:
+        return [
+            value.__qualname__,
+            code.co_code.hex(),
+            repr(code.co_consts),
+            repr(code.co_names),
+        ]
+    return repr(value)
+
+
+def _security_signature(dependant: Dependant) -> list[Any]:
+    """Returns signatures of security schemes the route depends on."""
+    signature = []
+    for dependency in dependant.dependencies:
+        if isinstance(dependency.call, SecurityBase):
+            scopes = getattr(
+                dependency,
+                "own_oauth_scopes",
+                getattr(dependency, "security_scopes", None),
+            )
+            signature.append([
+                dependency.call.scheme_name,
+                repr(dependency.call.model),
+                scopes,
+            ])
+        signature.append(_security_signature(dependency))
+    return signature
+
+
+def _route_signature(route: APIRoute, seen: set[type]) -> list[Any]:
+    params = [
+        [
+            param.name,
+            repr(param.field_info),
+            _type_signature(param.field_info.annotation, seen),
+        ]
+        for param in get_flat_params(route.dependant)
+    ]
+    body = None
+    if route.body_field is not None:
+        body = _type_signature(route.body_field.field_info.annotation, seen)
+    return [
+        route.path,
+        sorted(route.methods),
+        route.name,
+        route.summary,
+        route.description,
+        route.response_description,
+        route.operation_id,
+        route.tags,
+        route.status_code,
+        route.deprecated,
+        _value_signature(route.openapi_extra),
+        _type_signature(route.response_model, seen),
+        body,
+        params,
+        _security_signature(route.dependant),
+        [
+            [
+                str(code),
+                _type_signature(response.get("model"), seen),
+                _value_signature(
+                    {k: v for k, v in response.items() if k != "model"}
+                ),
+            ]
+            for code, response in route.responses.items()
+        ],
+        [
+            _route_signature(callback, seen)
+            for callback in route.callbacks or ()
+            if isinstance(callback, APIRoute)
+        ],
+    ]
+
+
+def routes_fingerprint(app: FastAPI) -> str:
+    """Calculates a hash of everything the OpenAPI schema is built from.
+
+    Args:
+        app: The FastAPI application instance.
+
+    Returns:
+        Hex digest that changes when routes or their models change.
+    """
+    seen: set[type] = set()
+    routes = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or not route.include_in_schema:
+            continue
+        routes.append(_route_signature(route, seen))
+    data = [
+        fastapi.__version__,
+        pydantic.VERSION,
+        app.title,
+        app.version,
+        app.openapi_version,
+        app.summary,
+        app.description,
+        app.terms_of_service,
+        _value_signature(app.contact),
+        _value_signature(app.license_info),
+        _value_signature(app.servers),
+        _value_signature(app.openapi_tags),
+        app.separate_input_output_schemas,
+        routes,
+    ]
+    encoded = json.dumps(data, default=repr, sort_keys=True)
+    # Object reprs are different in every process.
+    encoded = _MEMORY_ADDRESS_RE.sub("", encoded)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _replace_refs(node: Any, renames: dict[str, str]) -> Any:
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith(_SCHEMAS_REF_PREFIX):
+            name = ref[len(_SCHEMAS_REF_PREFIX):]
+            if name in renames:
+                node = {**node, "$ref": _SCHEMAS_REF_PREFIX + renames[name]}
+        return {k: _replace_refs(v, renames) for k, v in node.items()}
+    if isinstance(node, list):
+        return [_replace_refs(v, renames) for v in node]
+    return node
+
+
+def dedupe_schemas(schema: OpenAPISchema) -> OpenAPISchema:
+    """Merges identical component schemas into one.
+
+    Generic responses (e.g. repeated `DataResponse.single_by_key` calls)
+    produce equal schemas under different names. Equal schemas are
+    replaced by the shortest name and all references are updated.
+
+    Args:
+        schema: The OpenAPI schema.
+
+    Returns:
+        The OpenAPI schema without duplicated components.
+    """
+    while True:
+        components = schema.get("components", {}).get("schemas", {})
+        by_body: dict[str, list[str]] = {}
+        for name, body in components.items():
+            key = json.dumps(body, sort_keys=True)
+            by_body.setdefault(key, []).append(name)
+
+        renames: dict[str, str] = {}
+        for names in by_body.values():
+            if len(names) > 1:
+                keep, *duplicates = sorted(names, key=lambda n: (len(n), n))
+                renames.update({name: keep for name in duplicates})
+        if not renames:
+            return schema
+
+        schema = _replace_refs(schema, renames)
+        for name in renames:
+            del schema["components"]["schemas"][name]
+
+
+def load_openapi(path: str | os.PathLike, fingerprint: str) -> OpenAPISchema:
+    """Loads cached OpenAPI schema.
+
+    Args:
+        path: The cache file path.
+        fingerprint: Expected routes fingerprint.
+
+    Returns:
+        The cached schema.
+
+    Raises:
+        LookupError: The cache is missing or stale.
+    """
+    try:
+        cached = json.loads(Path(path).read_bytes())
+    except (OSError, ValueError) as exc:
+        raise LookupError(f"No OpenAPI cache at {path}") from exc
+    if cached.get("fingerprint") != fingerprint:
+        raise LookupError(f"Stale OpenAPI cache at {path}")
+    return cached["schema"]
+
+
+def save_openapi(
+        path: str | os.PathLike, fingerprint: str, schema: OpenAPISchema
+) -> None:
+    """Atomically writes OpenAPI schema cache."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(
+        json.dumps({"fingerprint": fingerprint, "schema": schema})
+    )
+    os.replace(tmp_path, path)
+
+
+def init_openapi_cache(
+        app: FastAPI,
+        path: str | os.PathLike | None = None,
+        eager: bool = True,
+        dedupe: bool = True,
+) -> None:
+    """Replaces `app.openapi` with a cached and deduplicated version.
+
+    The schema is loaded from `path` if the file was built for the same
+    routes (see `routes_fingerprint`), otherwise it's generated and
+    written to `path`, so other workers and restarts reuse it.
+
+    Args:
+        app: The FastAPI application instance.
+        path: The cache file path. Only in-memory cache if not provided.
+        eager: Build the schema on application startup instead of the
+            first `/openapi.json` request.
+        dedupe: Merge identical component schemas.
+    """
+    generate = app.openapi
+    state: dict[str, Any] = {"routes_count": None, "fingerprint": None}
+
+    def openapi() -> OpenAPISchema:
+        if state["routes_count"] != len(app.routes):
+            state["routes_count"] = len(app.routes)
+            fingerprint = routes_fingerprint(app)
+            if fingerprint != state["fingerprint"]:
+                state["fingerprint"] = fingerprint
+                app.openapi_schema = None
+        if app.openapi_schema:
+            return app.openapi_schema
+
+        schema = None
+        if path is not None:
+            try:
+                schema = load_openapi(path, state["fingerprint"])
+            except LookupError:
+                pass
+        if schema is None:
+            schema = generate()
+            if dedupe:
+                schema = dedupe_schemas(schema)
+            if path is not None:
+                save_openapi(path, state["fingerprint"], schema)
+
+        app.openapi_schema = schema
+        return schema
+
+    app.openapi = openapi
+    if eager:
+        # Startup event handlers don't run for apps with `lifespan`,
+        # wrap the lifespan context working for both.
+        lifespan = app.router.lifespan_context
+
+        @contextlib.asynccontextmanager
+        async def openapi_lifespan(app: Any) -> AsyncIterator[Any]:
+            openapi()
+            async with lifespan(app) as state:
+                yield state
+
+        app.router.lifespan_context = openapi_lifespan
+
+
+def build_openapi(
+        app: FastAPI, path: str | os.PathLike, dedupe: bool = True
+) -> OpenAPISchema:
+    """Builds OpenAPI schema cache file ahead of time (e.g. on build).
+
+    Args:
+        app: The FastAPI application instance.
+        path: The cache file path.
+        dedupe: Merge identical component schemas.
+
+    Returns:
+        The built schema.
+    """
+    init_openapi_cache(app, path=None, eager=False, dedupe=dedupe)
+    schema = app.openapi()
+    save_openapi(path, routes_fingerprint(app), schema)
+    return schema
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build OpenAPI schema cache for a FastAPI application."
+    )
+    parser.add_argument("app", help="Application import path: module:attr")
+    parser.add_argument("path", help="Cache file path")
+    parser.add_argument("--no-dedupe", action="store_true")
+    args = parser.parse_args()
+
+    module_name, _, attr = args.app.partition(":")
+    app = getattr(importlib.import_module(module_name), attr or "app")
+    build_openapi(app, args.path, dedupe=not args.no_dedupe)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import math
-from collections.abc import Sequence
+from collections.abc import AsyncIterable, Iterable, Mapping, Sequence
+from itertools import islice
 from typing import Annotated, Any, NamedTuple, Self
 
 import sqlalchemy as sa
@@ -8,6 +9,11 @@ from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql._typing import _ColumnsClauseArgument
 
+from fastapi_scaffold.boundaries import BoundaryIndex
+from fastapi_scaffold.coalescing import SingleFlight, statement_key
+from fastapi_scaffold.deadlines import deadline_scope
+from fastapi_scaffold.profiling import profile_phase
+
 
 class PaginationParams(NamedTuple):
     page: int
@@ -105,9 +111,13 @@ async def paginate(
     *,
     pagination: PaginationParams,
     count_clause: _ColumnsClauseArgument[Any] | None = None,
+    single_flight: SingleFlight | None = None,
+    boundary_index: BoundaryIndex | None = None,
 ) -> tuple[Sequence[Any], int]:
     """Paginates query by pagination params, returns result and total count.
 
+    The query is bounded by the request deadline (see `deadlines`).
+
     Args:
         session: The SQLAlchemy session.
         statement: The SQLAlchemy `SELECT` statement to paginate.
@@ -115,12 +125,22 @@ async def paginate(
         count_clause: Custom count clause. If not provided, the total
             count will be calculated using the `COUNT() OVER ()`
             window function.
+        single_flight: Coalesces identical concurrent queries (same
+            statement, parameters and pagination) into one. Rows are
+            shared between the callers.
+        boundary_index: Seeks deep pages from recorded sort key
+            boundaries instead of skipping all previous rows. A custom
+            `count_clause` must count all rows, not only the rows after
+            the boundary.
 
     Returns:
         - List selected items with applied pagination.
         - The total number of rows that match the query before pagination
             is applied.
 
+    Raises:
+        DeadlineExceeded: The request deadline expired.
+
     Example:
         >>> pagination = PaginationParams(page=2, limit=10)
         >>> stmt = select(User).where(User.is_active == True)
@@ -128,23 +148,163 @@ async def paginate(
 
     """
     offset = pagination.per_page * (pagination.page - 1)
-    statement = statement.offset(offset).limit(pagination.per_page)
+
+    seek = None
+    if boundary_index is not None:
+        seek = boundary_index.seek(session, statement, offset)
+    if seek is not None:
+        statement = seek.statement.add_columns(*seek.columns)
+        statement = statement.offset(offset - seek.position)
+    else:
+        statement = statement.offset(offset)
+    statement = statement.limit(pagination.per_page)
 
     if count_clause is None:
         statement = statement.add_columns(sa.over(sa.func.count()))
     else:
         statement = statement.add_columns(count_clause)
 
-    result = await session.execute(statement)
+    key_columns = len(seek.columns) if seek is not None else 0
+    if single_flight is not None:
+        rows, count, keys = await single_flight.do(
+            statement_key(session, statement),
+            lambda: _execute_paginated(session, statement, key_columns),
+        )
+    else:
+        rows, count, keys = await _execute_paginated(
+            session, statement, key_columns
+        )
+
+    if seek is not None:
+        boundary_index.record(seek, offset, keys)
+        if rows and count_clause is None:
+            count += seek.position
+    return rows, count
+
+
+async def _execute_paginated(
+    session: AsyncSession,
+    statement: sa.Select[Any],
+    key_columns: int = 0,
+    params: Mapping[str, Any] | None = None,
+) -> tuple[list[Any], int, list[tuple[Any, ...]]]:
+    """Executes statement with sort keys and count as the last columns."""
+    async with deadline_scope(session):
+        result = await session.execute(statement, params)
 
     rows: list[Any] = []
+    keys: list[tuple[Any, ...]] = []
     count = 0
-    for row in result.unique().all():
-        (*queried_data, c) = row._tuple()
-        count = int(c)
-        if len(queried_data) == 1:
-            rows.append(queried_data[0])
-        else:
-            rows.append(queried_data)
+    with profile_phase("paginate.rows"):
+        for row in result.unique().all():
+            (*queried_data, c) = row._tuple()
+            count = int(c)
+            if key_columns:
+                keys.append(tuple(queried_data[-key_columns:]))
+                queried_data = queried_data[:-key_columns]
+            if len(queried_data) == 1:
+                rows.append(queried_data[0])
+            else:
+                rows.append(queried_data)
 
-    return rows, count
+    return rows, count, keys
+
+
+def paginate_sequence(
+    items: Iterable[Any],
+    *,
+    pagination: PaginationParams,
+    count_limit: int | None = None,
+) -> tuple[Sequence[Any], int]:
+    """Paginates in-memory sequence or iterable, returns page and total.
+
+    Sequences are sliced, other iterables are consumed lazily: items
+    before the page are skipped without being stored.
+
+    Args:
+        items: Sequence or iterable to paginate.
+        pagination: Pagination params.
+        count_limit: Stop counting after this number of items. The
+            current page is always counted, so the total is at least
+            the last item position on the page. Counts all items if not
+            provided.
+
+    Returns:
+        - List of items on the requested page.
+        - The total number of items (up to `count_limit`).
+
+    Example:
+        >>> pagination = PaginationParams(page=2, per_page=10)
+        >>> hits, total = paginate_sequence(
+        ...     search(query), pagination=pagination, count_limit=1000
+        ... )
+
+    """
+    offset = pagination.per_page * (pagination.page - 1)
+    end = offset + pagination.per_page
+
+    if isinstance(items, Sequence):
+        total = len(items)
+        if count_limit is not None:
+            total = min(total, max(count_limit, end))
+        return items[offset:end], total
+
+    iterator = iter(items)
+    skipped = sum(1 for _ in islice(iterator, offset))
+    rows = list(islice(iterator, pagination.per_page))
+    total = skipped + len(rows)
+    if count_limit is None:
+        total += sum(1 for _ in iterator)
+    else:
+        total += sum(1 for _ in islice(iterator, max(count_limit - total, 0)))
+    return rows, total
+
+
+async def paginate_aiter(
+    items: AsyncIterable[Any],
+    *,
+    pagination: PaginationParams,
+    count_limit: int | None = None,
+) -> tuple[Sequence[Any], int]:
+    """Paginates async iterable, returns page and total.
+
+    Items before the page are skipped without being stored. Async
+    generators are closed when counting stops early.
+
+    Args:
+        items: Async iterable to paginate.
+        pagination: Pagination params.
+        count_limit: Stop counting after this number of items. The
+            current page is always counted, so the total is at least
+            the last item position on the page. Counts all items if not
+            provided.
+
+    Returns:
+        - List of items on the requested page.
+        - The total number of items (up to `count_limit`).
+
+    Example:
+        >>> pagination = PaginationParams(page=2, per_page=10)
+        >>> events, total = await paginate_aiter(
+        ...     stream_events(), pagination=pagination, count_limit=1000
+        ... )
+
+    """
+    offset = pagination.per_page * (pagination.page - 1)
+    end = offset + pagination.per_page
+    limit = None if count_limit is None else max(count_limit, end)
+
+    rows: list[Any] = []
+    total = 0
+    iterator = aiter(items)
+    try:
+        async for item in iterator:
+            if offset <= total < end:
+                rows.append(item)
+            total += 1
+            if total == limit:
+                break
+    finally:
+        if (aclose := getattr(iterator, "aclose", None)) is not None:
+            await aclose()
+    return rows, total
@@ -0,0 +1,290 @@
+import contextlib
+import random
+import time
+import tracemalloc
+from collections import deque
+from collections.abc import Iterator, Sequence
+from contextvars import ContextVar
+from typing import Any
+
+from fastapi import FastAPI, Query, params
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from fastapi_scaffold.metrics import UNMATCHED_ROUTE
+
+
+REQUEST_PHASE = "request"
+"""Phase of the whole request, includes all other phases."""
+
+
+class _Frame:
+    def __init__(self, name: str, current: int) -> None:
+        self.name = name
+        self.start = current
+        self.peak = current
+
+
+class _Profile:
+    """Phases memory of the profiled request."""
+
+    def __init__(self) -> None:
+        self.phases: dict[str, dict[str, int]] = {}
+        self._stack: list[_Frame] = []
+
+    def enter(self, name: str) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            outer = self._stack[-1]
+            outer.peak = max(outer.peak, peak)
+        tracemalloc.reset_peak()
+        self._stack.append(_Frame(name, current))
+
+    def exit(self) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        frame = self._stack.pop()
+        frame.peak = max(frame.peak, peak)
+        if self._stack:
+            outer = self._stack[-1]
+            outer.peak = max(outer.peak, frame.peak)
+
+        phase = self.phases.setdefault(
+            frame.name, {"calls": 0, "peak": 0, "retained": 0}
+        )
+        phase["calls"] += 1
+        phase["peak"] = max(phase["peak"], frame.peak - frame.start)
+        phase["retained"] += current - frame.start
+
+
+_profile: ContextVar[_Profile | None] = ContextVar(
+    "fastapi_scaffold_profile", default=None
+)
+
+
+@contextlib.contextmanager
+def profile_phase(name: str) -> Iterator[None]:
+    """Attributes allocations within the context to the phase.
+
+    Does nothing unless the current request is sampled by
+    `AllocationProfiler`. Nested phases are included in outer ones.
+
+    Example:
+        >>> with profile_phase("report.build"):
+        ...     report = build_report(rows)
+
+    Args:
+        name: The phase name.
+    """
+    profile = _profile.get()
+    if profile is None:
+        yield
+        return
+    profile.enter(name)
+    try:
+        yield
+    finally:
+        profile.exit()
+
+
+class AllocationProfiler:
+    """Samples requests and profiles their allocations with tracemalloc.
+
+    Tracing runs only during a sampled request and only one request is
+    profiled at a time. Allocations of requests running concurrently
+    are traced too, so profile under a moderate load or treat profiles
+    as an upper bound.
+
+    Every profile keeps peak and retained (allocated during the request
+    and still alive at its end) memory of the request and its phases
+    (see `profile_phase`) and top allocation sites of retained memory.
+
+    Args:
+        sample_rate: Fraction of requests to profile, can be changed at
+            runtime.
+        top_n: Number of allocation sites in a profile.
+        buffer_size: Number of last profiles kept.
+        frames: Number of traceback frames of an allocation site.
+    """
+
+    def __init__(
+            self,
+            sample_rate: float = 0.01,
+            top_n: int = 10,
+            buffer_size: int = 100,
+            frames: int = 1,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.top_n = top_n
+        self.frames = frames
+        self.profiles: deque[dict[str, Any]] = deque(maxlen=buffer_size)
+        self._active = False
+
+    def sample(self) -> bool:
+        """Decides whether to profile a new request."""
+        return not self._active and random.random() < self.sample_rate
+
+    @contextlib.contextmanager
+    def profile(self, method: str, scope: Scope) -> Iterator[None]:
+        """Profiles allocations within the context as a request.
+
+        Args:
+            method: The request method.
+            scope: The ASGI scope, read at exit for the route template.
+        """
+        self._active = True
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.frames)
+            baseline = None
+        else:
+            baseline = tracemalloc.take_snapshot()
+
+        profile = _Profile()
+        token = _profile.set(profile)
+        start = time.perf_counter()
+        profile.enter(REQUEST_PHASE)
+        try:
+            yield
+        finally:
+            profile.exit()
+            duration = time.perf_counter() - start
+            _profile.reset(token)
+            try:
+                snapshot = tracemalloc.take_snapshot()
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+                self._active = False
+
+            if baseline is None:
+                statistics = [
+                    (stat.traceback, stat.size, stat.count)
+                    for stat in snapshot.statistics("traceback")
+                ]
+            else:
+                statistics = [
+                    (stat.traceback, stat.size_diff, stat.count_diff)
+                    for stat in snapshot.compare_to(baseline, "traceback")
+                    if stat.size_diff > 0
+                ]
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            self.profiles.append({
+                "timestamp": time.time(),
+                "method": method,
+                "route": route,
+                "duration": duration,
+                "phases": profile.phases,
+                "top": [
+                    {
+                        "site": [
+                            f"{frame.filename}:{frame.lineno}"
+                            for frame in traceback
+                        ],
+                        "size": size,
+                        "count": count,
+                    }
+                    for traceback, size, count in statistics[:self.top_n]
+                ],
+            })
+
+    def summary(self) -> dict[str, dict[str, dict[str, float]]]:
+        """Returns phases memory of kept profiles by route templates.
+
+        Returns:
+            Number of samples, maximum peak and mean retained bytes by
+            `"<method> <route>"` and phase.
+        """
+        totals: dict[str, dict[str, dict[str, float]]] = {}
+        for profile in self.profiles:
+            route = totals.setdefault(
+                f"{profile['method']} {profile['route']}", {}
+            )
+            for name, phase in profile["phases"].items():
+                stats = route.setdefault(
+                    name, {"samples": 0, "max_peak": 0, "retained": 0}
+                )
+                stats["samples"] += 1
+                stats["max_peak"] = max(stats["max_peak"], phase["peak"])
+                stats["retained"] += phase["retained"]
+        for route in totals.values():
+            for stats in route.values():
+                stats["retained"] /= stats["samples"]
+        return totals
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling sampled requests.
+
+    Args:
+        app: The ASGI application.
+        profiler: Allocation profiler.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: AllocationProfiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.profiler.sample():
+            await self.app(scope, receive, send)
+            return
+
+        with self.profiler.profile(scope["method"], scope):
+            await self.app(scope, receive, send)
+
+
+def init_profiling(
+        app: FastAPI,
+        profiler: AllocationProfiler | None = None,
+        path: str | None = "/debug/allocations",
+        dependencies: Sequence[params.Depends] | None = None,
+) -> AllocationProfiler:
+    """Installs profiling middleware and the debug endpoint.
+
+    `GET <path>` returns the profiles and their summary,
+    `PUT <path>?sample_rate=<rate>` changes the sample rate.
+
+    The endpoint exposes source paths and controls tracing overhead, so
+    it's mounted only with `dependencies` restricting access to it.
+
+    Example:
+        >>> init_profiling(app, dependencies=[Depends(require_admin)])
+
+    Args:
+        app: The FastAPI application instance.
+        profiler: Allocation profiler. A new one is created if not
+            provided.
+        path: The debug endpoint path.
+        dependencies: Endpoint dependencies checking access, e.g.
+            authentication. The endpoint isn't mounted if not provided.
+
+    Returns:
+        The installed allocation profiler.
+    """
+    profiler = profiler or AllocationProfiler()
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+    if path is not None and dependencies:
+        async def get_allocations() -> dict[str, Any]:
+            return {
+                "sample_rate": profiler.sample_rate,
+                "summary": profiler.summary(),
+                "profiles": list(profiler.profiles),
+            }
+
+        async def set_sample_rate(
+                sample_rate: float = Query(..., ge=0, le=1),
+        ) -> dict[str, Any]:
+            profiler.sample_rate = sample_rate
+            return {"sample_rate": profiler.sample_rate}
+
+        for endpoint, method in (
+            (get_allocations, "GET"), (set_sample_rate, "PUT")
+        ):
+            app.add_api_route(
+                path,
+                endpoint,
+                methods=[method],
+                dependencies=dependencies,
+                include_in_schema=False,
+            )
+    return profiler
@@ -4,6 +4,7 @@ from pydantic import BaseModel, ConfigDict, create_model
 from pydantic_core import ErrorDetails
 
 from fastapi_scaffold.pagination import PaginationParams, PaginationSchema
+from fastapi_scaffold.profiling import profile_phase
 
 
 class Schema(BaseModel):
@@ -93,8 +94,9 @@ class ListResponse[ListItem](DataResponse[ListItem]):
         message_kwarg = {}
         if response_message is not None:
             message_kwarg = {"message": response_message}
-        return cls(
-            data=ListData[cls._get_list_elements_type(items)](list=items),
-            pagination=PaginationSchema.from_params(params, total_count),
-            **message_kwarg,
-        )
+        with profile_phase("ListResponse.from_list"):
+            return cls(
+                data=ListData[cls._get_list_elements_type(items)](list=items),
+                pagination=PaginationSchema.from_params(params, total_count),
+                **message_kwarg,
+            )
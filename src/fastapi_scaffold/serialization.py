@@ -0,0 +1,213 @@
+import asyncio
+import time
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+from fastapi_scaffold.profiling import profile_phase
+from fastapi_scaffold.responses import ListData
+
+
+_LIST_PLACEHOLDER = b'"data":{"list":[]'
+
+
+class SerializationStats:
+    """Response serialization counters.
+
+    Attributes:
+        inline: Responses serialized at once.
+        chunked: Responses serialized in chunks.
+        chunks: Number of serialized chunks.
+        blocking_avoided: Seconds the event loop would be blocked
+            additionally if chunked responses were serialized at once.
+    """
+
+    def __init__(self) -> None:
+        self.inline = 0
+        self.chunked = 0
+        self.chunks = 0
+        self.blocking_avoided = 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return dict(vars(self))
+
+
+class ResponseSerializer:
+    """Size-aware JSON serializer for list responses.
+
+    Pydantic serialization holds the GIL, so moving it to a thread
+    doesn't unblock the event loop. Instead large `ListResponse` items
+    are serialized in chunks taking about `budget` seconds each, and
+    other requests are handled between the chunks. Small responses are
+    serialized at once.
+
+    Serialization time per item is measured for every item type, so
+    chunk sizes tune themselves.
+
+    Args:
+        budget: Target event loop blocking time per chunk in seconds.
+        initial_chunk_size: Chunk size for item types not measured yet.
+        smoothing: Weight of a new measurement in the moving average.
+        max_concurrent: Maximum number of responses serialized in
+            chunks concurrently, limits memory for large payloads.
+    """
+
+    def __init__(
+            self,
+            budget: float = 0.005,
+            initial_chunk_size: int = 1000,
+            smoothing: float = 0.2,
+            max_concurrent: int = 4,
+    ) -> None:
+        self.budget = budget
+        self.initial_chunk_size = initial_chunk_size
+        self.smoothing = smoothing
+        self.stats = SerializationStats()
+        self._costs: dict[type, float] = {}
+        self._adapters: dict[type, TypeAdapter[Any]] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def chunk_size(self, item_type: type) -> int:
+        """Returns number of items serialized within the budget."""
+        cost = self._costs.get(item_type)
+        if cost is None:
+            return self.initial_chunk_size
+        return max(int(self.budget / cost), 1)
+
+    def _observe(self, item_type: type, items: int, seconds: float) -> None:
+        if items == 0:
+            return
+        cost = seconds / items
+        if (previous := self._costs.get(item_type)) is not None:
+            cost = previous + self.smoothing * (cost - previous)
+        self._costs[item_type] = cost
+
+    def _adapter(self, item_type: type) -> TypeAdapter[Any]:
+        if (adapter := self._adapters.get(item_type)) is None:
+            adapter = self._adapters[item_type] = TypeAdapter(list[item_type])
+        return adapter
+
+    async def serialize(self, content: BaseModel) -> bytes:
+        """Serializes response schema to JSON.
+
+        Args:
+            content: The response schema.
+
+        Returns:
+            JSON bytes.
+        """
+        with profile_phase("serialize"):
+            return await self._serialize(content)
+
+    async def _serialize(self, content: BaseModel) -> bytes:
+        data = getattr(content, "data", None)
+        items: Sequence[Any] = ()
+        if isinstance(data, ListData):
+            items = data.list
+        item_type = type(items[0]) if items else type(None)
+
+        if len(items) <= self.chunk_size(item_type):
+            start = time.perf_counter()
+            body = content.__pydantic_serializer__.to_json(
+                content, by_alias=True
+            )
+            self._observe(item_type, len(items), time.perf_counter() - start)
+            self.stats.inline += 1
+            return body
+
+        async with self._semaphore:
+            return await self._serialize_chunked(content, items, item_type)
+
+    async def _serialize_chunked(
+            self,
+            content: BaseModel,
+            items: Sequence[Any],
+            item_type: type,
+    ) -> bytes:
+        envelope = content.model_copy(
+            update={"data": content.data.model_copy(update={"list": []})}
+        )
+        envelope_json = envelope.__pydantic_serializer__.to_json(
+            envelope, by_alias=True
+        )
+        # Position of the empty list closing bracket.
+        split_at = envelope_json.index(_LIST_PLACEHOLDER)
+        split_at += len(_LIST_PLACEHOLDER) - 1
+
+        adapter = self._adapter(item_type)
+        parts = [envelope_json[:split_at]]
+        total = longest = 0.0
+        position = 0
+        while position < len(items):
+            size = self.chunk_size(item_type)
+            chunk = items[position:position + size]
+            start = time.perf_counter()
+            chunk_json = adapter.dump_json(chunk, by_alias=True)
+            elapsed = time.perf_counter() - start
+            self._observe(item_type, len(chunk), elapsed)
+
+            if position:
+                parts.append(b",")
+            parts.append(chunk_json[1:-1])
+            position += len(chunk)
+            total += elapsed
+            longest = max(longest, elapsed)
+            self.stats.chunks += 1
+            # Let the event loop handle other requests.
+            await asyncio.sleep(0)
+
+        parts.append(envelope_json[split_at:])
+        self.stats.chunked += 1
+        self.stats.blocking_avoided += total - longest
+        return b"".join(parts)
+
+    async def render(
+            self,
+            content: BaseModel,
+            status_code: int = 200,
+            headers: Mapping[str, str] | None = None,
+    ) -> Response:
+        """Serializes response schema to JSON response.
+
+        Args:
+            content: The response schema.
+            status_code: The response status code.
+            headers: Additional headers.
+
+        Returns:
+            JSON response.
+        """
+        return Response(
+            content=await self.serialize(content),
+            status_code=status_code,
+            headers=headers,
+            media_type="application/json",
+        )
+
+
+serializer = ResponseSerializer()
+"""Default response serializer."""
+
+
+async def render_response(
+        content: BaseModel,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+) -> Response:
+    """Serializes response schema with the default serializer.
+
+    FastAPI returns the response as is: it isn't validated and filtered
+    by the route `response_model`, which only documents the schema.
+
+    Example:
+        >>> @app.get('/users', response_model=ListResponse[User])
+        >>> async def get_users(...):
+        ...     response = ListResponse[User].from_list(
+        ...         users, total_count, pagination, None
+        ...     )
+        ...     return await render_response(response)
+
+    """
+    return await serializer.render(content, status_code, headers)
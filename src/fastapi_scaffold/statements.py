@@ -0,0 +1,291 @@
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterator, Mapping, Sequence
+from types import CodeType, FunctionType, ModuleType
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import QueryableAttribute
+from sqlalchemy.sql import ClauseElement, visitors
+from sqlalchemy.sql._typing import _ColumnsClauseArgument
+from sqlalchemy.sql.elements import BindParameter
+
+from fastapi_scaffold.coalescing import SingleFlight
+from fastapi_scaffold.pagination import PaginationParams, _execute_paginated
+from fastapi_scaffold.sorting import Model, SortParams, sort
+
+
+OFFSET_PARAM = "scaffold_offset"
+LIMIT_PARAM = "scaffold_limit"
+
+# Values a statement builder may capture: they define the statement
+# structure and are the same for every request.
+_STRUCTURAL_TYPES = (type, ModuleType, ClauseElement, QueryableAttribute)
+
+
+def _code_names(code: CodeType) -> Iterator[str]:
+    """Yields global names read by the code and its nested functions."""
+    yield from code.co_names
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            yield from _code_names(const)
+
+
+def _check_value(build: Callable[..., Any], value: Any) -> None:
+    """Rejects a captured value that isn't the statement structure.
+
+    SQL elements are structural unless they hold values, e.g. a
+    prebuilt `Article.author_id == author_id` condition.
+    """
+    if isinstance(value, ClauseElement):
+        for element in visitors.iterate(value):
+            if (
+                isinstance(element, BindParameter)
+                and element.key not in (OFFSET_PARAM, LIMIT_PARAM)
+                and (element.value is not None or element.callable)
+            ):
+                break
+        else:
+            return
+    elif isinstance(value, _STRUCTURAL_TYPES):
+        return
+    raise ValueError(
+        f"Statement builder {build} captures {value!r}: pass request "
+        f"values as `bindparam` with `params` instead"
+    )
+
+
+def _check_build(build: Callable[[], sa.Select[Any]]) -> None:
+    """Rejects builders capturing values, e.g. request filter values.
+
+    A cached statement is built only once, so a captured value of the
+    first request would be used for all requests.
+
+    Raises:
+        ValueError: The builder isn't a function or captures a value by
+            a closure, default arguments or a global variable.
+    """
+    if not isinstance(build, FunctionType):
+        raise ValueError(
+            f"Statement builder must be a function or lambda, got {build!r}"
+        )
+    captured = [
+        *(cell.cell_contents for cell in build.__closure__ or ()),
+        *(build.__defaults__ or ()),
+        *(build.__kwdefaults__ or {}).values(),
+    ]
+    for value in captured:
+        _check_value(build, value)
+    for name in set(_code_names(build.__code__)):
+        if name not in build.__globals__:
+            continue  # An attribute or builtin name.
+        value = build.__globals__[name]
+        # Global functions (e.g. `select`) build the statement.
+        if callable(value) and not isinstance(value, ClauseElement):
+            continue
+        _check_value(build, value)
+
+
+class StatementCacheStats:
+    """Statement cache counters.
+
+    Attributes:
+        hits: Requests that reused a cached statement.
+        misses: Requests that built a new statement.
+        evictions: Statements removed from the full cache.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {**vars(self), "hit_rate": self.hit_rate}
+
+
+class StatementCache:
+    """LRU cache of sorted and paginated statements.
+
+    `paginate` builds a statement once for every combination of the
+    route key, sort field, sort order and count mode. Offset and limit
+    are bound parameters, so a cached statement is executed as is: the
+    statement isn't constructed again, and SQLAlchemy reuses both its
+    cache key (memoized on the statement) and the compiled SQL.
+
+    Values varying between requests (filters) must be bound parameters
+    too: use `sa.bindparam` in the statement and pass values in
+    `params`. The statement builder may capture (by a closure, default
+    arguments or globals) only models, columns and SQL elements without
+    bound values, otherwise `ValueError` is raised: values captured by
+    the first request would be used for all requests.
+
+    Args:
+        maxsize: Number of cached statements.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.stats = StatementCacheStats()
+        self._statements: OrderedDict[Hashable, sa.Select[Any]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    @staticmethod
+    def _cache_key(
+            key: Hashable,
+            build: Callable[[], sa.Select[Any]],
+            sorting: SortParams | None,
+            count_clause: _ColumnsClauseArgument[Any] | None,
+    ) -> Hashable:
+        # Builder code distinguishes different statements under one key.
+        code = build.__code__
+        if sorting is None:
+            return (key, code, None, None, count_clause is None)
+        return (
+            key,
+            code,
+            str(sorting.sort_by),
+            str(sorting.sort_order),
+            count_clause is None,
+        )
+
+    def get(
+            self,
+            key: Hashable,
+            build: Callable[[], sa.Select[Any]],
+            *,
+            sorting: SortParams | None = None,
+            model: Model | None = None,
+            count_clause: _ColumnsClauseArgument[Any] | None = None,
+    ) -> sa.Select[Any]:
+        """Returns cached statement or builds a new one.
+
+        Args:
+            key: The statement key, e.g. the route path.
+            build: Returns the statement without sorting and pagination.
+                May capture only models and SQL elements.
+            sorting: Sorting params.
+            model: Sorting model, see `sort`.
+            count_clause: Custom count clause, see `paginate`. Cached
+                once for the key.
+
+        Returns:
+            Statement with sorting, bound offset and limit parameters
+            and the count column.
+
+        Raises:
+            ValueError: `build` captures a value.
+        """
+        _check_build(build)
+        cache_key = self._cache_key(key, build, sorting, count_clause)
+        statement = self._statements.get(cache_key)
+        if statement is not None:
+            self.stats.hits += 1
+            self._statements.move_to_end(cache_key)
+            return statement
+
+        self.stats.misses += 1
+        statement = build()
+        if sorting is not None:
+            statement = sort(statement, sorting=sorting, model=model)
+        statement = statement.offset(sa.bindparam(OFFSET_PARAM))
+        statement = statement.limit(sa.bindparam(LIMIT_PARAM))
+        if count_clause is None:
+            statement = statement.add_columns(sa.over(sa.func.count()))
+        else:
+            statement = statement.add_columns(count_clause)
+
+        self._statements[cache_key] = statement
+        if len(self._statements) > self.maxsize:
+            self._statements.popitem(last=False)
+            self.stats.evictions += 1
+        return statement
+
+    async def paginate(
+            self,
+            session: AsyncSession,
+            key: Hashable,
+            build: Callable[[], sa.Select[Any]],
+            *,
+            pagination: PaginationParams,
+            sorting: SortParams | None = None,
+            model: Model | None = None,
+            count_clause: _ColumnsClauseArgument[Any] | None = None,
+            params: Mapping[str, Any] | None = None,
+            single_flight: SingleFlight | None = None,
+    ) -> tuple[Sequence[Any], int]:
+        """`sort` and `paginate` with the cached statement.
+
+        The query is bounded by the request deadline (see `deadlines`).
+
+        Args:
+            session: The SQLAlchemy session.
+            key: The statement key, e.g. the route path.
+            build: Returns the statement without sorting and pagination.
+                Called only on a cache miss, may capture only models and
+                SQL elements.
+            pagination: Pagination params.
+            sorting: Sorting params.
+            model: Sorting model, see `sort`.
+            count_clause: Custom count clause, see `paginate`.
+            params: Values of the statement bound parameters.
+            single_flight: Coalesces identical concurrent queries (same
+                key, parameters and pagination) into one.
+
+        Returns:
+            - List selected items with applied pagination.
+            - The total number of rows that match the query before
+                pagination is applied.
+
+        Raises:
+            ValueError: `build` captures a value.
+            DeadlineExceeded: The request deadline expired.
+
+        Example:
+            >>> statements = StatementCache()
+            >>> articles, total = await statements.paginate(
+            ...     session,
+            ...     "/articles",
+            ...     lambda: select(Article).where(
+            ...         Article.author_id == bindparam("author_id")
+            ...     ),
+            ...     pagination=pagination,
+            ...     sorting=sorting,
+            ...     params={"author_id": author_id},
+            ... )
+
+        """
+        statement = self.get(
+            key, build, sorting=sorting, model=model, count_clause=count_clause
+        )
+        params = {
+            **(params or {}),
+            OFFSET_PARAM: pagination.per_page * (pagination.page - 1),
+            LIMIT_PARAM: pagination.per_page,
+        }
+
+        if single_flight is not None:
+            bind = session.get_bind()
+            flight_key = (
+                str(bind.engine.url),
+                self._cache_key(key, build, sorting, count_clause),
+                repr(sorted(params.items())),
+            )
+            rows, count, _ = await single_flight.do(
+                flight_key,
+                lambda: _execute_paginated(session, statement, params=params),
+            )
+        else:
+            rows, count, _ = await _execute_paginated(
+                session, statement, params=params
+            )
+        return rows, count
@@ -0,0 +1,77 @@
+import asyncio
+import random
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from fastapi_scaffold.boundaries import BoundaryIndex
+from fastapi_scaffold.pagination import PaginationParams, paginate
+from fastapi_scaffold.sorting import SortOrderOptions, SortParams, sort
+
+
+ROWS = 300
+PER_PAGE = 10
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Person(Base):
+    __tablename__ = "people"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str]
+    age: Mapped[int | None]
+
+
+async def compare_pages(sort_by: str, sort_order: SortOrderOptions) -> int:
+    """Paginates all pages with and without the index, returns seeks."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    rnd = random.Random(42)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(sa.insert(Person), [
+            {
+                "id": i,
+                "name": f"Person {rnd.randint(1, 50)}",
+                "age": rnd.choice([None, rnd.randint(1, 99)]),
+            }
+            for i in range(1, ROWS + 1)
+        ])
+
+    index = BoundaryIndex(stride=20)
+    sorting = SortParams(sort_by=sort_by, sort_order=sort_order)
+    statement = sort(sa.select(Person), sorting=sorting, model=Person)
+    try:
+        async with async_sessionmaker(engine)() as session:
+            # Visit pages twice: the second pass seeks from boundaries.
+            for _ in range(2):
+                for page in range(1, ROWS // PER_PAGE + 2):
+                    pagination = PaginationParams(page, PER_PAGE)
+                    expected, expected_total = await paginate(
+                        session, statement, pagination=pagination
+                    )
+                    rows, total = await paginate(
+                        session,
+                        statement,
+                        pagination=pagination,
+                        boundary_index=index,
+                    )
+                    assert [r.id for r in rows] == [r.id for r in expected]
+                    assert total == expected_total
+    finally:
+        await engine.dispose()
+    return index.seeks
+
+
+@pytest.mark.parametrize("sort_order", list(SortOrderOptions))
+def test_seek_matches_offset(sort_order):
+    assert asyncio.run(compare_pages("name", sort_order)) > 0
+
+
+@pytest.mark.parametrize("sort_order", list(SortOrderOptions))
+def test_nullable_column_falls_back_to_offset(sort_order):
+    assert asyncio.run(compare_pages("age", sort_order)) == 0
@@ -0,0 +1,90 @@
+import asyncio
+
+from fastapi_scaffold.coalescing import SingleFlight
+from fastapi_scaffold.deadlines import deadline, remaining
+from fastapi_scaffold.exc import DeadlineExceeded, GatewayTimeout
+
+
+async def slow_query() -> str:
+    """Query bounded by the deadline of the calling request."""
+    try:
+        async with asyncio.timeout(remaining()):
+            await asyncio.sleep(0.2)
+    except TimeoutError:
+        raise DeadlineExceeded()
+    return "rows"
+
+
+def test_leader_deadline_does_not_fail_waiting_calls():
+    async def main():
+        flight = SingleFlight()
+
+        async def call(timeout: float | None) -> str:
+            with deadline(timeout):
+                return await flight.do("key", slow_query)
+
+        return await asyncio.gather(
+            call(0.05), call(None), call(None), call(None),
+            return_exceptions=True,
+        ), flight.stats
+
+    results, stats = asyncio.run(main())
+    assert isinstance(results[0], DeadlineExceeded)
+    assert results[1:] == ["rows"] * 3
+    assert stats.abandoned == 1
+    assert stats.leaders == 2
+    assert stats.coalesced == 3
+
+
+def test_waiting_call_bounded_by_own_deadline():
+    async def main():
+        flight = SingleFlight()
+        loop = asyncio.get_running_loop()
+
+        async def call(timeout: float | None) -> tuple[str, float]:
+            start = loop.time()
+            with deadline(timeout):
+                try:
+                    result = await flight.do("key", slow_query)
+                except DeadlineExceeded:
+                    result = "expired"
+            return result, loop.time() - start
+
+        return await asyncio.gather(call(None), call(0.05)), flight.stats
+
+    (leader, waiting), stats = asyncio.run(main())
+    assert leader[0] == "rows"
+    assert waiting[0] == "expired"
+    assert waiting[1] < 0.15
+    assert stats.timeouts == 0
+
+
+def test_timeout_raises_gateway_timeout():
+    async def main():
+        flight = SingleFlight(timeout=0.05)
+        return await asyncio.gather(
+            flight.do("key", slow_query), flight.do("key", slow_query),
+            return_exceptions=True,
+        ), flight.stats
+
+    results, stats = asyncio.run(main())
+    assert all(isinstance(r, GatewayTimeout) for r in results)
+    assert not any(isinstance(r, DeadlineExceeded) for r in results)
+    assert stats.coalesced == 1
+
+
+def test_waiting_call_gets_leader_exception():
+    async def main():
+        flight = SingleFlight()
+
+        async def failing() -> None:
+            await asyncio.sleep(0.01)
+            raise ValueError("query failed")
+
+        return await asyncio.gather(
+            flight.do("key", failing), flight.do("key", failing),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
@@ -0,0 +1,58 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from fastapi_scaffold import init_exc_handlers
+from fastapi_scaffold.exc import ResourceNotFound, ScaffoldException
+
+
+app = FastAPI()
+init_exc_handlers(app)
+
+
+@app.get("/articles/{article_id}")
+async def get_article(article_id: int):
+    raise ResourceNotFound(f"Article {article_id} isn't found")
+
+
+@app.get("/ranges")
+async def get_range():
+    raise ScaffoldException(
+        "Range isn't satisfiable", 416, headers={"Content-Range": "bytes */10"}
+    )
+
+
+@app.get("/legacy")
+async def get_legacy():
+    raise HTTPException(409, "Conflict")
+
+
+client = TestClient(app)
+
+
+def test_scaffold_exception_response():
+    response = client.get("/articles/1")
+    assert response.status_code == 404
+    assert response.json()["success"] is False
+    assert response.json()["message"] == "Article 1 isn't found"
+
+
+def test_exception_headers_are_kept():
+    response = client.get("/ranges")
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
+    assert response.json()["success"] is False
+
+
+def test_router_errors_response():
+    response = client.get("/missing")
+    assert response.status_code == 404
+    assert response.json()["success"] is False
+    response = client.post("/legacy")
+    assert response.status_code == 405
+    assert response.json()["success"] is False
+
+
+def test_fastapi_http_exception_response():
+    response = client.get("/legacy")
+    assert response.status_code == 409
+    assert response.json()["message"] == "Conflict"
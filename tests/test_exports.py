@@ -0,0 +1,181 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+import httpx
+import pytest
+import sqlalchemy as sa
+from fastapi import FastAPI, Request
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from fastapi_scaffold import init_exc_handlers
+from fastapi_scaffold.exc import ScaffoldException
+from fastapi_scaffold.exports import ExportManager, ExportStatus, parse_range
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Article(Base):
+    __tablename__ = "articles"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    title: Mapped[str]
+
+
+class ArticleSchema(BaseModel):
+    model_config = {"from_attributes": True}
+
+    id: int
+    title: str
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=95-200", (95, 99)),
+    ("bytes=-5", (95, 99)),
+    ("bytes=-200", (0, 99)),
+    ("bytes=0-1,5-6", None),
+    ("items=0-9", None),
+    ("bytes=5-2", None),
+    ("bytes=a-b", None),
+    ("bytes=5", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize(
+    "header", ["bytes=100-", "bytes=200-300", "bytes=-0"]
+)
+def test_parse_unsatisfiable_range(header):
+    with pytest.raises(ScaffoldException) as exc_info:
+        parse_range(header, 100)
+    assert exc_info.value.status_code == 416
+    assert exc_info.value.headers == {"Content-Range": "bytes */100"}
+
+
+type Scenario = Callable[
+    [httpx.AsyncClient, str], Awaitable[list[httpx.Response]]
+]
+
+
+async def export_file(
+        directory: Path, scenario: Scenario
+) -> tuple[bytes, list[httpx.Response]]:
+    """Exports articles and requests the file by the scenario.
+
+    Returns:
+        The export file content and the scenario responses.
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(sa.insert(Article), [
+            {"id": i, "title": f"Article {i}"} for i in range(1, 21)
+        ])
+
+    exports = ExportManager(async_sessionmaker(engine), directory)
+    app = FastAPI()
+    init_exc_handlers(app)
+
+    @app.api_route("/exports/{job_id}/file", methods=["GET", "HEAD"])
+    async def download_export(job_id: str, request: Request):
+        return exports.file_response(job_id, request)
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with exports, httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            job = await exports.submit(sa.select(Article), ArticleSchema)
+            while exports.get(job.id).status != ExportStatus.done:
+                await asyncio.sleep(0.01)
+            content = exports.path(job.id).read_bytes()
+            responses = await scenario(client, f"/exports/{job.id}/file")
+    finally:
+        await engine.dispose()
+    return content, responses
+
+
+def request_all(*requests: tuple[str, dict[str, str]]) -> Scenario:
+    async def scenario(client, url):
+        return [
+            await client.request(method, url, headers=headers)
+            for method, headers in requests
+        ]
+    return scenario
+
+
+def test_file_ranges(tmp_path):
+    content, responses = asyncio.run(export_file(tmp_path, request_all(
+        ("GET", {}),
+        ("GET", {"Range": "bytes=10-19"}),
+        ("GET", {"Range": "bytes=-5"}),
+        ("GET", {"Range": "bytes=0-1,5-6"}),
+    )))
+    full, partial, suffix, multiple = responses
+    size = len(content)
+
+    assert full.status_code == 200
+    assert full.content == content
+    assert full.headers["accept-ranges"] == "bytes"
+    assert full.headers["content-length"] == str(size)
+
+    assert partial.status_code == 206
+    assert partial.content == content[10:20]
+    assert partial.headers["content-range"] == f"bytes 10-19/{size}"
+
+    assert suffix.status_code == 206
+    assert suffix.content == content[-5:]
+    assert suffix.headers["content-range"] == (
+        f"bytes {size - 5}-{size - 1}/{size}"
+    )
+
+    assert multiple.status_code == 200
+    assert multiple.content == content
+
+
+def test_unsatisfiable_ranges(tmp_path):
+    content, responses = asyncio.run(export_file(tmp_path, request_all(
+        ("GET", {"Range": "bytes=-0"}),
+        ("GET", {"Range": "bytes=100000-"}),
+    )))
+    for response in responses:
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(content)}"
+        assert response.json()["success"] is False
+
+
+def test_if_range(tmp_path):
+    async def scenario(client, url):
+        etag = (await client.head(url)).headers["etag"]
+        return [
+            await client.get(
+                url, headers={"Range": "bytes=0-9", "If-Range": if_range}
+            )
+            for if_range in (etag, '"stale"')
+        ]
+
+    content, (matching, stale) = asyncio.run(export_file(tmp_path, scenario))
+    assert matching.status_code == 206
+    assert matching.content == content[:10]
+    assert stale.status_code == 200
+    assert stale.content == content
+
+
+def test_head(tmp_path):
+    content, (full, partial) = asyncio.run(export_file(tmp_path, request_all(
+        ("HEAD", {}),
+        ("HEAD", {"Range": "bytes=0-9"}),
+    )))
+    assert full.status_code == 200
+    assert full.headers["content-length"] == str(len(content))
+    assert full.content == b""
+    assert partial.status_code == 206
+    assert partial.headers["content-length"] == "10"
+    assert partial.content == b""
@@ -0,0 +1,48 @@
+from enum import IntEnum
+
+from fastapi import FastAPI
+from pydantic import BaseModel, ConfigDict
+
+from fastapi_scaffold.openapi import routes_fingerprint
+
+
+def make_app(
+        levels: list[int],
+        config: ConfigDict | None = None,
+        **route_kwargs,
+) -> FastAPI:
+    Level = IntEnum("Level", {f"L{level}": level for level in levels})
+
+    class Item(BaseModel):
+        model_config = config or ConfigDict()
+
+        level: Level
+
+    app = FastAPI()
+
+    @app.get("/items", response_model=Item, **route_kwargs)
+    async def get_item():
+        pass
+
+    return app
+
+
+def test_fingerprint_is_stable():
+    assert (
+        routes_fingerprint(make_app([1, 2]))
+        == routes_fingerprint(make_app([1, 2]))
+    )
+
+
+def test_fingerprint_changes_with_schema():
+    base = routes_fingerprint(make_app([1, 2]))
+    changed = [
+        make_app([1, 2, 3]),
+        make_app([1, 2], ConfigDict(json_schema_extra={"example": 1})),
+        make_app([1, 2], operation_id="items"),
+        make_app([1, 2], response_description="Item"),
+        make_app([1, 2], openapi_extra={"x-internal": True}),
+    ]
+    fingerprints = {routes_fingerprint(app) for app in changed}
+    assert base not in fingerprints
+    assert len(fingerprints) == len(changed)
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from fastapi_scaffold.pagination import PaginationParams
+from fastapi_scaffold.sorting import SortOrderOptions, SortParams
+from fastapi_scaffold.statements import StatementCache
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Article(Base):
+    __tablename__ = "articles"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    author_id: Mapped[int]
+
+
+SORTING = SortParams(sort_by="id", sort_order=SortOrderOptions.asc)
+PAGINATION = PaginationParams(1, 10)
+AUTHOR_FILTER = Article.author_id == sa.bindparam("author_id")
+FIRST_AUTHOR_FILTER = Article.author_id == 0
+
+
+def test_rejects_captured_values():
+    cache = StatementCache()
+    author_id = 1
+    with pytest.raises(ValueError):
+        cache.get(
+            "/articles",
+            lambda: sa.select(Article).where(Article.author_id == author_id),
+        )
+    with pytest.raises(ValueError):
+        cache.get("/articles", lambda author_id=author_id: sa.select(Article))
+    assert cache.stats.misses == 0
+
+
+def test_rejects_captured_conditions_with_values():
+    cache = StatementCache()
+    author_id = 1
+    condition = Article.author_id == author_id
+    with pytest.raises(ValueError):
+        cache.get("/articles", lambda: sa.select(Article).where(condition))
+    with pytest.raises(ValueError):
+        cache.get(
+            "/articles",
+            lambda: sa.select(Article).where(FIRST_AUTHOR_FILTER),
+        )
+    assert cache.stats.misses == 0
+
+    condition = Article.author_id == sa.bindparam("author_id")
+    cache.get("/articles", lambda: sa.select(Article).where(condition))
+    cache.get("/authors", lambda: sa.select(Article).where(AUTHOR_FILTER))
+    assert cache.stats.misses == 2
+
+
+def test_bound_parameters_per_request():
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(sa.insert(Article), [
+                {"id": i, "author_id": i % 2} for i in range(1, 11)
+            ])
+
+        cache = StatementCache()
+        results = []
+        async with async_sessionmaker(engine)() as session:
+            for author_id in (0, 1):
+                rows, total = await cache.paginate(
+                    session,
+                    "/articles",
+                    lambda: sa.select(Article).where(
+                        Article.author_id == sa.bindparam("author_id")
+                    ),
+                    pagination=PAGINATION,
+                    sorting=SORTING,
+                    model=Article,
+                    params={"author_id": author_id},
+                )
+                results.append(([r.id for r in rows], total))
+        await engine.dispose()
+        return results, cache.stats
+
+    results, stats = asyncio.run(main())
+    assert results == [([2, 4, 6, 8, 10], 5), ([1, 3, 5, 7, 9], 5)]
+    assert (stats.hits, stats.misses) == (1, 1)